@@ -0,0 +1,57 @@
+# benchmarks/compare.py
+
+"""
+Compare two benchmark result files written by run.py.
+
+    python benchmarks/compare.py benchmarks/results/OLD.json benchmarks/results/NEW.json
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# wall-time changes inside this band are reported as noise
+NOISE = 0.05
+
+
+def load(path: Path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _change(old, new) -> str:
+    if old is None or new is None:
+        return '-'
+    if not old:
+        return '-' if not new else 'new'
+    return f"{(new - old) / old:+.1%}"
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    lines = []
+    if old.get('tree') != new.get('tree'):
+        lines.append("Warning: the runs used different trees; numbers are not directly comparable.\n")
+    lines.append(f"{'benchmark':<22} {'old s':>9} {'new s':>9} {'wall':>8} {'stat':>8} {'open':>8} {'RSS':>8}  verdict")
+    for name in [n for n in old['results'] if n in new['results']]:
+        a, b = old['results'][name], new['results'][name]
+        if 'error' in a or 'error' in b:
+            lines.append(f"{name:<22} failed in {'old' if 'error' in a else 'new'} run")
+            continue
+        ratio = (b['wall_s'] - a['wall_s']) / a['wall_s'] if a['wall_s'] else 0.0
+        verdict = 'faster' if ratio < -NOISE else 'SLOWER' if ratio > NOISE else ''
+        lines.append(f"{name:<22} {a['wall_s']:9.3f} {b['wall_s']:9.3f} {_change(a['wall_s'], b['wall_s']):>8} "
+                     f"{_change(a['stat_calls'], b['stat_calls']):>8} {_change(a['open_calls'], b['open_calls']):>8} "
+                     f"{_change(a['peak_rss_kib'], b['peak_rss_kib']):>8}  {verdict}")
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files.')
+    parser.add_argument('old', type=Path)
+    parser.add_argument('new', type=Path)
+    args = parser.parse_args()
+    old, new = load(args.old), load(args.new)
+    print(f"old: {old.get('commit')} ({old.get('created')})   new: {new.get('commit')} ({new.get('created')})")
+    print("\n".join(compare(old, new)))
+    sys.exit(0)
@@ -0,0 +1,283 @@
+# benchmarks/run.py
+
+"""
+Benchmarks for the filesystem-heavy parts of pythonkitchen, run against a synthetic tree.
+
+    python benchmarks/run.py                       # all benchmarks, medium tree
+    python benchmarks/run.py --preset large --repeat 5 backup_job restore_job
+    python benchmarks/compare.py benchmarks/results/A.json benchmarks/results/B.json
+
+Each run of a benchmark happens in a fresh subprocess with $HOME pointed at the temp
+directory, so peak RSS is per benchmark and backups never touch the real home. The
+code under test is imported from this checkout's src/, so checking out another commit
+and rerunning compares the two. Results go to benchmarks/results/<time>-<commit>.json.
+
+stat and open counts come from wrapping os.stat/os.lstat and from the interpreter's
+audit hooks (open, os.scandir, os.listdir); stats made through DirEntry.stat() and
+calls in worker processes are not counted.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import statistics
+import subprocess
+import contextlib
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+SRC = HERE.parent / 'src'
+RESULTS_DIR = HERE / 'results'
+
+sys.path.insert(0, str(HERE))
+from synth_tree import generate_tree, add_tree_arguments, params_from_args  # noqa: E402
+
+
+# --- benchmarks: each gets the tree, a fresh work dir and the options, does its
+# untimed setup and returns the callable to time
+
+def _write_config(work: Path, tree: Path, options: dict) -> Path:
+    job = {'name': 'bench', 'source': [str(tree)], 'destination': str(work / 'dest')}
+    if options.get('compression'):
+        job['compression'] = options['compression']
+    if options.get('format'):
+        job['format'] = options['format']
+    config = work / 'backup_config.json'
+    config.write_text(json.dumps({'bk_jobs': [job]}))
+    return config
+
+
+def bench_compute_sources_hash(tree, work, options):
+    from pythonkitchen.backup_jobs import compute_sources_hash
+    return lambda: compute_sources_hash([tree], workers=options['workers'])
+
+
+def bench_backup_job(tree, work, options):
+    from pythonkitchen.backup_jobs import backup_job
+    config = _write_config(work, tree, options)
+    return lambda: backup_job(config, 'bench', hash_workers=options['workers'])
+
+
+def bench_backup_job_unchanged(tree, work, options):
+    from pythonkitchen.backup_jobs import backup_job
+    config = _write_config(work, tree, options)
+    backup_job(config, 'bench', hash_workers=options['workers'])
+    return lambda: backup_job(config, 'bench', hash_workers=options['workers'])
+
+
+def bench_restore_job(tree, work, options):
+    from pythonkitchen.backup_jobs import backup_job, restore_job
+    config = _write_config(work, tree, options)
+    backup_job(config, 'bench', hash_workers=options['workers'])
+    return lambda: restore_job(config, 'bench', target=work / 'restored', workers=options['workers'])
+
+
+def bench_build_tree(tree, work, options):
+    from pythonkitchen.project_export import build_tree
+    return lambda: build_tree(tree)
+
+
+def bench_dump_code_files(tree, work, options):
+    from pythonkitchen.project_export import dump_code_files
+    return lambda: dump_code_files(tree)
+
+
+def bench_custom_tree(tree, work, options):
+    from pythonkitchen.custom_tree import tree as custom_tree
+    return lambda: custom_tree(str(tree), max_files=options['max_files'])
+
+
+# name -> (setup, whether the benchmark reads file contents, so MB/s means something)
+BENCHMARKS = {
+    'compute_sources_hash': (bench_compute_sources_hash, True),
+    'backup_job': (bench_backup_job, True),
+    'backup_job_unchanged': (bench_backup_job_unchanged, False),
+    'restore_job': (bench_restore_job, True),
+    'build_tree': (bench_build_tree, False),
+    'dump_code_files': (bench_dump_code_files, True),
+    'custom_tree': (bench_custom_tree, False),
+}
+
+
+class SyscallCounter:
+    """
+    Counts stat, open and directory listing calls made by this process from now on.
+    """
+    def __init__(self):
+        self.counts = {'stat': 0, 'open': 0, 'listdir': 0}
+        self.enabled = False
+        for name in ('stat', 'lstat'):
+            original = getattr(os, name)
+
+            def counted(*args, _original=original, **kwargs):
+                if self.enabled:
+                    self.counts['stat'] += 1
+                return _original(*args, **kwargs)
+            setattr(os, name, counted)
+        sys.addaudithook(self._audit)
+
+    def _audit(self, event, args):
+        if not self.enabled:
+            return
+        if event == 'open':
+            self.counts['open'] += 1
+        elif event in ('os.scandir', 'os.listdir'):
+            self.counts['listdir'] += 1
+
+
+def peak_rss_kib() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_child(name: str, tree: Path, work: Path, options: dict, result_file: Path) -> None:
+    """
+    One timed run of one benchmark, in this (fresh) process.
+    """
+    sys.path.insert(0, str(SRC))
+    setup, _ = BENCHMARKS[name]
+    counter = SyscallCounter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        fn = setup(tree, work, options)
+        counter.enabled = True
+        started = time.perf_counter()
+        fn()
+        wall = time.perf_counter() - started
+        counter.enabled = False
+    result = {'wall_s': wall, 'peak_rss_kib': peak_rss_kib()}
+    result.update({f"{k}_calls": v for k, v in counter.counts.items()})
+    result_file.write_text(json.dumps(result))
+
+
+def run_benchmark(name: str, tree: Path, tmp: Path, options: dict, repeat: int, tree_stats: dict) -> dict:
+    runs = []
+    for i in range(repeat):
+        work = tmp / f"work-{name}-{i}"
+        work.mkdir()
+        result_file = tmp / f"{name}-{i}.json"
+        env = dict(os.environ, HOME=str(tmp / 'home'))
+        cmd = [sys.executable, str(Path(__file__).resolve()), '--child', name, '--tree', str(tree),
+               '--work', str(work), '--result-file', str(result_file), '--options', json.dumps(options)]
+        proc = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        shutil.rmtree(work, ignore_errors=True)
+        if proc.returncode != 0:
+            return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+        runs.append(json.loads(result_file.read_text()))
+
+    best = min(runs, key=lambda r: r['wall_s'])
+    walls = [r['wall_s'] for r in runs]
+    reads_content = BENCHMARKS[name][1]
+    return {
+        'wall_s': best['wall_s'],
+        'wall_median_s': statistics.median(walls),
+        'runs': walls,
+        'files_per_s': tree_stats['files'] / best['wall_s'] if best['wall_s'] else None,
+        'mb_per_s': tree_stats['bytes'] / 1e6 / best['wall_s'] if reads_content and best['wall_s'] else None,
+        'stat_calls': best['stat_calls'],
+        'open_calls': best['open_calls'],
+        'listdir_calls': best['listdir_calls'],
+        'peak_rss_kib': max((r['peak_rss_kib'] for r in runs if r['peak_rss_kib'] is not None), default=None),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', str(SRC)], cwd=HERE, capture_output=True,
+                               text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def format_row(name: str, r: dict) -> str:
+    if 'error' in r:
+        return f"{name:<22} failed: {r['error']}"
+    mb = f"{r['mb_per_s']:8.1f}" if r['mb_per_s'] is not None else f"{'-':>8}"
+    rss = f"{r['peak_rss_kib'] / 1024:8.1f}" if r['peak_rss_kib'] is not None else f"{'-':>8}"
+    return (f"{name:<22} {r['wall_s']:9.3f} {r['files_per_s']:10.0f} {mb} "
+            f"{r['stat_calls']:8} {r['open_calls']:8} {r['listdir_calls']:8} {rss}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark pythonkitchen against a synthetic tree.')
+    parser.add_argument('benchmarks', nargs='*', help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    add_tree_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the fastest is reported')
+    parser.add_argument('--workers', type=int, default=4, help='Hash/restore threads (default: 4)')
+    parser.add_argument('--compression', default=None, help="Backup codec, e.g. 'zstd' (default: the job default)")
+    parser.add_argument('--format', default=None, help="Backup format, e.g. 'chunked' (default: tar)")
+    parser.add_argument('--max-files', type=int, default=2, help='custom_tree files per directory')
+    parser.add_argument('--output', type=Path, default=None, help='Result file (default: benchmarks/results/...)')
+    parser.add_argument('--keep', action='store_true', help='Keep the temp directory with the tree')
+    # internal: a single run inside a child process
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--tree', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--work', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--options', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.tree, args.work, json.loads(args.options), args.result_file)
+        return
+
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    options = {'workers': args.workers, 'compression': args.compression, 'format': args.format,
+               'max_files': args.max_files}
+    params = params_from_args(args)
+
+    tmp = Path(tempfile.mkdtemp(prefix='pk-bench-'))
+    try:
+        tree = tmp / 'home' / 'tree'
+        started = time.perf_counter()
+        tree_stats = generate_tree(tree, **params)
+        print(f"Tree: {tree_stats['files']:,} files in {tree_stats['dirs']:,} directories, "
+              f"{tree_stats['bytes'] / 1e6:.1f} MB (built in {time.perf_counter() - started:.1f}s)")
+        print(f"{'benchmark':<22} {'wall s':>9} {'files/s':>10} {'MB/s':>8} {'stat':>8} {'open':>8} "
+              f"{'listdir':>8} {'RSS MiB':>8}")
+        results = {}
+        for name in names:
+            results[name] = run_benchmark(name, tree, tmp, options, args.repeat, tree_stats)
+            print(format_row(name, results[name]), flush=True)
+    finally:
+        if args.keep:
+            print(f"Kept {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'tree': dict(params, **tree_stats),
+        'options': options,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
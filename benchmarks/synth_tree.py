@@ -0,0 +1,123 @@
+# benchmarks/synth_tree.py
+
+"""
+Deterministic synthetic source trees for the benchmarks.
+
+    python benchmarks/synth_tree.py /tmp/tree --preset medium
+"""
+
+import os
+import json
+import math
+import random
+import argparse
+from pathlib import Path
+
+# named starting points; any individual parameter can still be overridden
+PRESETS = {
+    'small': dict(depth=2, fanout=3, files_per_dir=15, size_median=8 * 1024, size_sigma=1.2),
+    'medium': dict(depth=3, fanout=4, files_per_dir=25, size_median=16 * 1024, size_sigma=1.5),
+    'large': dict(depth=4, fanout=5, files_per_dir=40, size_median=32 * 1024, size_sigma=1.8),
+}
+DEFAULTS = dict(PRESETS['medium'], size_max=64 * 1024 * 1024, incompressible=0.3, seed=0)
+
+TEXT_EXTS = ['.py', '.md', '.txt', '.json', '.toml']
+BINARY_EXTS = ['.bin', '.exr', '.jpg']
+
+
+def _text_block(rng: random.Random, size: int = 64 * 1024) -> bytes:
+    """
+    Code-like text that compresses about as well as real source files.
+    """
+    words = ['def', 'return', 'self', 'value', 'path', 'items', 'for', 'in', 'if', 'else', 'None',
+             'config', 'result', 'import', 'from', 'with', 'open', 'data', 'name', 'index']
+    lines = []
+    total = 0
+    while total < size:
+        indent = '    ' * rng.randint(0, 3)
+        line = indent + ' '.join(rng.choice(words) for _ in range(rng.randint(2, 9))) + '\n'
+        lines.append(line)
+        total += len(line)
+    return ''.join(lines).encode()[:size]
+
+
+def _file_size(rng: random.Random, median: int, sigma: float, size_max: int) -> int:
+    return max(0, min(size_max, int(rng.lognormvariate(math.log(max(median, 1)), sigma))))
+
+
+def generate_tree(root, depth: int = DEFAULTS['depth'], fanout: int = DEFAULTS['fanout'],
+                  files_per_dir: int = DEFAULTS['files_per_dir'], size_median: int = DEFAULTS['size_median'],
+                  size_sigma: float = DEFAULTS['size_sigma'], size_max: int = DEFAULTS['size_max'],
+                  incompressible: float = DEFAULTS['incompressible'], seed: int = DEFAULTS['seed']) -> dict:
+    """
+    Build a tree `depth` directory levels deep with `fanout` subdirectories and
+    `files_per_dir` files per directory. File sizes follow a log-normal distribution
+    around size_median; an `incompressible` share of the files holds random bytes,
+    the rest code-like text. The same arguments always give the same tree.
+    Returns {'dirs', 'files', 'bytes'}.
+    """
+    rng = random.Random(seed)
+    text = _text_block(rng)
+    root = Path(root)
+    stats = {'dirs': 0, 'files': 0, 'bytes': 0}
+
+    def fill(directory: Path, level: int) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        stats['dirs'] += 1
+        for i in range(files_per_dir):
+            size = _file_size(rng, size_median, size_sigma, size_max)
+            if rng.random() < incompressible:
+                path = directory / f"f{i:04d}{rng.choice(BINARY_EXTS)}"
+                data = rng.randbytes(size)
+            else:
+                path = directory / f"f{i:04d}{rng.choice(TEXT_EXTS)}"
+                # a unique first line keeps digests distinct; the rest repeats the text block
+                header = f"# {path.name} {rng.getrandbits(64):016x}\n".encode()
+                body = text[rng.randrange(len(text)):] + text * (size // len(text) + 1)
+                data = (header + body)[:size]
+            with open(path, 'wb') as f:
+                f.write(data)
+            stats['files'] += 1
+            stats['bytes'] += size
+        if level < depth:
+            for d in range(fanout):
+                fill(directory / f"d{d:02d}", level + 1)
+
+    fill(root, 0)
+    return stats
+
+
+def tree_params(preset: str | None = None, **overrides) -> dict:
+    params = dict(DEFAULTS)
+    if preset:
+        params.update(PRESETS[preset])
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    return params
+
+
+def add_tree_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='medium', help='Tree size (default: medium)')
+    parser.add_argument('--depth', type=int, help='Directory levels below the root')
+    parser.add_argument('--fanout', type=int, help='Subdirectories per directory')
+    parser.add_argument('--files-per-dir', type=int, help='Files in every directory')
+    parser.add_argument('--size-median', type=int, help='Median file size in bytes')
+    parser.add_argument('--size-sigma', type=float, help='Spread of the log-normal file size distribution')
+    parser.add_argument('--size-max', type=int, help='Largest file size in bytes')
+    parser.add_argument('--incompressible', type=float, help='Share of files filled with random bytes (0-1)')
+    parser.add_argument('--seed', type=int, help='Random seed')
+
+
+def params_from_args(args) -> dict:
+    return tree_params(args.preset, depth=args.depth, fanout=args.fanout, files_per_dir=args.files_per_dir,
+                       size_median=args.size_median, size_sigma=args.size_sigma, size_max=args.size_max,
+                       incompressible=args.incompressible, seed=args.seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic source tree for benchmarks.')
+    parser.add_argument('root', help='Directory to create the tree in')
+    add_tree_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.root) and os.listdir(args.root):
+        parser.error(f"{args.root} is not empty")
+    print(json.dumps(generate_tree(args.root, **params_from_args(args))))
@@ -0,0 +1,261 @@
+# src/pythonkitchen/archive_codecs.py
+
+import os
+import gzip
+import lzma
+import zlib
+import click
+
+# archive suffix per codec; restore detects the codec from the file's magic bytes
+SUFFIXES = {
+    'gzip': '.tar.gz',
+    'zstd': '.tar.zst',
+    'lz4': '.tar.lz4',
+    'xz': '.tar.xz',
+    'none': '.tar',
+}
+DEFAULT_LEVELS = {'gzip': 9, 'zstd': 3, 'lz4': 0, 'xz': 6, 'none': None}
+MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'\x04\x22\x4d\x18', 'lz4'),
+    (b'\xfd7zXZ\x00', 'xz'),
+]
+
+# already-compressed media: spending CPU on them buys nothing
+INCOMPRESSIBLE_EXTS = {
+    '.exr', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.avif',
+    '.mp4', '.mov', '.mkv', '.avi', '.webm', '.m4v', '.mxf',
+    '.mp3', '.aac', '.m4a', '.ogg', '.opus', '.flac',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.lz4', '.7z', '.rar', '.npz',
+}
+# archive is stored uncompressed when at least this share of its bytes is incompressible
+STORE_ONLY_RATIO = 0.9
+
+# multi-threaded zstd splits a frame into jobs of about four windows (8 MiB at level 3),
+# so a smaller frame is compressed by a single thread; blocks of multi-threaded zstd
+# archives are made at least this large, trading coarser restore access for parallelism
+ZSTD_MT_BLOCK_SIZE = 32 * 1024 * 1024
+
+
+def parse_compression(setting) -> dict:
+    """
+    Normalise a job's "compression" value: a codec name ("zstd") or a dict like
+    {"codec": "zstd", "level": 10, "threads": -1}. Defaults to gzip level 9.
+    """
+    if setting is None:
+        setting = 'gzip'
+    if isinstance(setting, str):
+        setting = {'codec': setting}
+    codec = setting.get('codec', 'gzip')
+    if codec not in SUFFIXES:
+        click.echo(f"Unknown compression codec '{codec}', expected one of: {', '.join(SUFFIXES)}")
+        raise click.Abort()
+    return {
+        'codec': codec,
+        'level': setting.get('level', DEFAULT_LEVELS[codec]),
+        'threads': setting.get('threads', -1),
+    }
+
+
+def mostly_incompressible(sizes: dict[str, int]) -> bool:
+    """
+    sizes maps file names to byte sizes. True when the incompressible ones dominate.
+    """
+    total = sum(sizes.values())
+    if not total:
+        return False
+    skipped = sum(n for name, n in sizes.items() if os.path.splitext(name)[1].lower() in INCOMPRESSIBLE_EXTS)
+    return skipped / total >= STORE_ONLY_RATIO
+
+
+def _require(module: str, codec: str):
+    try:
+        return __import__(module, fromlist=['_'])
+    except ImportError:
+        click.echo(f"Compression '{codec}' needs the '{module.split('.')[0]}' package (pip install {module.split('.')[0]}).")
+        raise click.Abort()
+
+
+class _Passthrough:
+    def compress(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+
+class _Lz4Frame:
+    def __init__(self, lz4_frame, level):
+        self._comp = lz4_frame.LZ4FrameCompressor(compression_level=level or 0)
+        self._header = self._comp.begin()
+
+    def compress(self, data):
+        out, self._header = self._header + self._comp.compress(data), b''
+        return out
+
+    def flush(self):
+        return self._header + self._comp.flush()
+
+
+def _frame_factory(codec: str, level=None, threads: int = -1):
+    """
+    Callable returning a fresh compressor for one self-contained frame (gzip member,
+    xz stream, zstd or lz4 frame). Concatenated frames still decode as a single stream.
+    All zstd frames share one ZstdCompressor, so its worker threads are started once.
+    """
+    if codec == 'gzip':
+        return lambda: zlib.compressobj(level if level is not None else 9, zlib.DEFLATED, 31)
+    if codec == 'xz':
+        return lambda: lzma.LZMACompressor(format=lzma.FORMAT_XZ, preset=level if level is not None else 6)
+    if codec == 'zstd':
+        zstandard = _require('zstandard', codec)
+        return zstandard.ZstdCompressor(level=level if level is not None else 3, threads=threads).compressobj
+    if codec == 'lz4':
+        lz4_frame = _require('lz4.frame', codec)
+        return lambda: _Lz4Frame(lz4_frame, level)
+    return _Passthrough
+
+
+def block_size(codec: str, threads: int, size: int) -> int:
+    """
+    Uncompressed size to aim for per block, given the size the caller would like.
+    """
+    if codec == 'zstd' and threads != 0:
+        return max(size, ZSTD_MT_BLOCK_SIZE)
+    return size
+
+
+class BlockWriter:
+    """
+    Write-only file object compressing into a sequence of independent blocks.
+    new_block() ends the current frame, so each block can later be read on its
+    own from its compressed offset. tell() reports the uncompressed position,
+    which is all tarfile needs.
+    """
+    def __init__(self, path, codec: str, level=None, threads: int = -1):
+        self.codec = codec
+        self.level = level
+        self.threads = threads
+        self.blocks = []  # [compressed offset, compressed length]
+        self._fp = open(path, 'wb')
+        self._pos = 0
+        self._block_start = 0
+        self._block_size = 0
+        self._new_frame = _frame_factory(codec, level, threads)
+        self._comp = self._new_frame()
+
+    def write(self, data) -> int:
+        self._fp.write(self._comp.compress(data))
+        self._pos += len(data)
+        self._block_size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    @property
+    def block_size(self) -> int:
+        return self._block_size
+
+    def new_block(self) -> None:
+        if not self._block_size:
+            return
+        self._fp.write(self._comp.flush())
+        end = self._fp.tell()
+        self.blocks.append([self._block_start, end - self._block_start])
+        self._block_start = end
+        self._block_size = 0
+        self._comp = self._new_frame()
+
+    def close(self) -> None:
+        if self._fp.closed:
+            return
+        self.new_block()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Region:
+    """
+    Read-only view of length bytes of a file starting at offset.
+    """
+    def __init__(self, fp, offset: int, length: int | None):
+        fp.seek(offset)
+        self._fp = fp
+        self._left = length
+
+    def read(self, size=-1):
+        if self._left is None:
+            return self._fp.read(size)
+        if size is None or size < 0 or size > self._left:
+            size = self._left
+        data = self._fp.read(size)
+        self._left -= len(data)
+        return data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._fp.close()
+
+    @property
+    def closed(self):
+        return self._fp.closed
+
+
+class _Reader:
+    """
+    Decompressing reader that also closes the underlying region when done.
+    """
+    def __init__(self, stream, region):
+        self._stream = stream
+        self._region = region
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def close(self):
+        self._stream.close()
+        self._region.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def detect_codec(path) -> str:
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, codec in MAGIC:
+        if head.startswith(magic):
+            return codec
+    return 'none'
+
+
+def open_reader(path, offset: int = 0, length: int | None = None, codec: str | None = None):
+    """
+    Binary file object yielding the decompressed tar stream of an archive, whatever its
+    codec. With offset/length only that region (one or more whole blocks) is read.
+    """
+    codec = codec or detect_codec(path)
+    region = _Region(open(path, 'rb'), offset, length)
+    if codec == 'gzip':
+        stream = gzip.GzipFile(fileobj=region, mode='rb')
+    elif codec == 'xz':
+        stream = lzma.LZMAFile(region, 'rb')
+    elif codec == 'zstd':
+        stream = _require('zstandard', codec).ZstdDecompressor().stream_reader(region, read_across_frames=True)
+    elif codec == 'lz4':
+        stream = _require('lz4.frame', codec).LZ4FrameFile(region, 'rb')
+    else:
+        stream = region
+    return _Reader(stream, region)
@@ -4,9 +4,31 @@ import os
 import json
 import tarfile
 import re
+import stat
+import time
+import fnmatch
 import hashlib
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import click
+from pythonkitchen import archive_codecs, chunk_store
+from pythonkitchen.restore_engine import RestoreEngine
+
+# large reads let hashlib release the GIL, so hashing threads actually overlap
+HASH_BUFSIZE = 1024 * 1024
+
+# incremental jobs write a full snapshot at least this often (in versions)
+DEFAULT_FULL_EVERY = 10
+
+# full archives are written in one hash-and-archive pass only when at least this share
+# of the bytes is stale; below it, hashing the few stale files first is cheaper than
+# risking a whole archive that turns out identical to the last one
+SINGLE_PASS_RATIO = 0.5
+
+# tar members are packed into independently compressed blocks of about this size,
+# so a single member can be restored by decompressing only its block (multi-threaded
+# zstd uses larger blocks, see archive_codecs.block_size)
+INDEX_BLOCK_SIZE = 4 * 1024 * 1024
 
 
 def load_config(config_path: Path) -> dict:
@@ -28,26 +50,327 @@ def get_job(config: dict, job_name: str) -> dict | None:
     return None
 
 
-def compute_sources_hash(sources: list[Path]) -> str:
+def source_arcname(src: Path) -> str:
     """
-    Compute a SHA256 hash over all files in sources (files and directories) in sorted order.
+    Name a source is stored under inside archives: relative to $HOME when possible.
     """
-    h = hashlib.sha256()
+    try:
+        return str(src.relative_to(Path.home()))
+    except ValueError:
+        return src.name
+
+
+def scan_sources(sources: list[Path]) -> list[tuple[str, str, os.stat_result]]:
+    """
+    Walk all sources once with os.scandir and return (arcname, path, lstat) for every
+    directory, regular file and symlink, sorted by arcname. Nothing is opened or read.
+    FIFOs, sockets and device nodes are skipped: opening them can block or fail.
+    """
+    found = []
+
+    def special(path: str, st: os.stat_result) -> bool:
+        if stat.S_ISDIR(st.st_mode) or stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode):
+            return False
+        click.echo(f"Skipping special file: {path}")
+        return True
+
+    def walk(dir_path: str, arc_prefix: str):
+        try:
+            it = os.scandir(dir_path)
+        except FileNotFoundError:
+            click.echo(f"Source vanished during scan: {dir_path}")
+            return
+        with it:
+            for entry in it:
+                arc = f"{arc_prefix}/{entry.name}"
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    click.echo(f"Source vanished during scan: {entry.path}")
+                    continue
+                if special(entry.path, st):
+                    continue
+                found.append((arc, entry.path, st))
+                if stat.S_ISDIR(st.st_mode):
+                    walk(entry.path, arc)
+
     for src in sorted(sources, key=lambda p: str(p)):
-        if src.is_dir():
-            for file in sorted(src.rglob('*'), key=lambda p: str(p)):
-                if file.is_file():
-                    with open(file, 'rb') as fp:
-                        while chunk := fp.read(8192):
-                            h.update(chunk)
-        elif src.is_file():
-            with open(src, 'rb') as fp:
-                while chunk := fp.read(8192):
-                    h.update(chunk)
+        try:
+            st = os.lstat(src)
+        except FileNotFoundError:
+            click.echo(f"Source not found: {src}")
+            continue
+        if special(str(src), st):
+            continue
+        arc = source_arcname(src)
+        found.append((arc, str(src), st))
+        if stat.S_ISDIR(st.st_mode):
+            walk(str(src), arc)
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+def entry_kind(st: os.stat_result) -> str:
+    if stat.S_ISDIR(st.st_mode):
+        return 'd'
+    if stat.S_ISLNK(st.st_mode):
+        return 'l'
+    if stat.S_ISREG(st.st_mode):
+        return 'f'
+    # scan_sources never returns these; hashing would open them
+    raise ValueError(f"Not a regular file, directory or symlink (mode {st.st_mode:o})")
+
+
+def hash_file(path: str) -> str:
+    """
+    SHA256 of a single file's content (or of the link target for symlinks).
+    """
+    if os.path.islink(path):
+        return hashlib.sha256(os.readlink(path).encode()).hexdigest()
+    h = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        while chunk := fp.read(HASH_BUFSIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_files(paths: list[str], workers: int = 1) -> list[str]:
+    """
+    Hash files, concurrently when workers > 1. Digests come back in input order.
+    """
+    if workers <= 1 or len(paths) <= 1:
+        return [hash_file(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_file, paths))
+
+
+def load_manifest(manifest_file: Path) -> tuple[dict, int | None]:
+    """
+    Load a job manifest: ({arcname: [kind, size, mtime_ns, inode, digest]}, backup version
+    it describes). A missing or unreadable manifest just means everything gets rehashed.
+    """
+    if not manifest_file.exists():
+        return {}, None
+    try:
+        with open(manifest_file, 'r') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}, None
+    return data.get('entries', {}), data.get('backup_version')
+
+
+def save_manifest(manifest_file: Path, entries: dict, backup_version: int | None) -> None:
+    tmp = manifest_file.with_name(manifest_file.name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'version': 1, 'backup_version': backup_version, 'entries': entries},
+                  f, separators=(',', ':'))
+    os.replace(tmp, manifest_file)
+
+
+def update_manifest(scanned: list, previous: dict, verify: bool = False,
+                    workers: int = 1, hash_stale: bool = True) -> tuple[dict, list[str]]:
+    """
+    Build the manifest for the current state of the sources. Files whose
+    (kind, size, mtime_ns, inode) match the previous manifest reuse its digest;
+    everything else is stale and gets rehashed on `workers` threads, or left with
+    a None digest when hash_stale=False so the archive writer can hash it in the
+    same read. With verify=True every file is stale. Returns (entries, stale arcnames).
+    """
+    entries = {}
+    stale = []
+    for arc, path, st in scanned:
+        kind = entry_kind(st)
+        if kind == 'd':
+            entries[arc] = [kind, 0, 0, st.st_ino, '']
+            continue
+        old = previous.get(arc)
+        key = [kind, st.st_size, st.st_mtime_ns, st.st_ino]
+        if not verify and old and old[:4] == key:
+            entries[arc] = old
+            continue
+        entries[arc] = key + [None]
+        stale.append(arc)
+    if hash_stale:
+        fill_digests(entries, stale, dict((arc, path) for arc, path, _ in scanned), workers)
+    return entries, stale
+
+
+def fill_digests(entries: dict, arcs: list[str], paths: dict, workers: int = 1) -> None:
+    for arc, digest in zip(arcs, hash_files([paths[arc] for arc in arcs], workers)):
+        entries[arc][4] = digest
+
+
+def tree_digest(entries: dict) -> str:
+    """
+    Combine per-entry digests into one whole-tree digest, in sorted arcname order.
+    """
+    h = hashlib.sha256()
+    for arc in sorted(entries):
+        kind, digest = entries[arc][0], entries[arc][4]
+        h.update(f"{kind}\0{arc}\0{digest}\n".encode())
     return h.hexdigest()
 
 
-def backup_job(config_path: Path, job_name: str) -> None:
+def compute_sources_hash(sources: list[Path], workers: int = 1) -> str:
+    """
+    Compute a SHA256 hash over all files in sources (files and directories) in sorted order,
+    reading every byte. Equal to the digest backup_job derives from its manifest, whatever
+    the number of hashing workers.
+    """
+    entries, _ = update_manifest(scan_sources(sources), {}, verify=True, workers=workers)
+    return tree_digest(entries)
+
+
+def diff_manifests(previous: dict, entries: dict) -> tuple[list[str], list[str]]:
+    """
+    Compare two manifests and return (added or modified arcnames, deleted arcnames).
+    Directories only count when they are new, not when their mtime moves.
+    """
+    changed = []
+    for arc, entry in entries.items():
+        old = previous.get(arc)
+        if old is None or old[0] != entry[0] or (entry[0] != 'd' and old[4] != entry[4]):
+            changed.append(arc)
+    deleted = [arc for arc in previous if arc not in entries]
+    return sorted(changed), sorted(deleted)
+
+
+def list_versions(dest: Path, job_name: str) -> list[tuple[int, Path]]:
+    """
+    All archives of a job in the destination as (version, path), oldest first.
+    Chunked versions are listed by their .chunks.json manifest.
+    """
+    pattern = re.compile(rf"{re.escape(job_name)}-(\d+)\.(?:tar(?:\.(?:gz|zst|lz4|xz))?|chunks\.json)$")
+    if not dest.is_dir():
+        return []
+    versions = [(int(m.group(1)), f) for f in dest.iterdir() if (m := pattern.match(f.name))]
+    return sorted(versions, key=lambda x: x[0])
+
+
+def version_meta_path(dest: Path, job_name: str, version: int) -> Path:
+    return dest / f"{job_name}-{version}.meta.json"
+
+
+def load_version_meta(dest: Path, job_name: str, version: int) -> dict:
+    """
+    Sidecar describing how a version was written. Archives without one are full snapshots.
+    """
+    meta_file = version_meta_path(dest, job_name, version)
+    if not meta_file.exists():
+        return {'type': 'full'}
+    with open(meta_file, 'r') as f:
+        return json.load(f)
+
+
+def version_chain(dest: Path, job_name: str, version: int) -> list[int]:
+    """
+    Versions needed to reconstruct `version`: its last full snapshot followed by
+    every incremental up to and including it.
+    """
+    chain = [version]
+    meta = load_version_meta(dest, job_name, version)
+    while meta.get('type') == 'incremental':
+        chain.append(meta['base'])
+        meta = load_version_meta(dest, job_name, meta['base'])
+    return chain[::-1]
+
+
+class _HashingReader:
+    """
+    File wrapper feeding every byte tarfile reads into a hasher as well.
+    """
+    def __init__(self, fp, hasher):
+        self.fp = fp
+        self.hasher = hasher
+
+    def read(self, size=-1):
+        data = self.fp.read(size)
+        self.hasher.update(data)
+        return data
+
+
+def write_tar(archive_path: Path, items: list[tuple[str, str]], entries: dict,
+              codec: str, level=None, threads: int = -1) -> dict:
+    """
+    Write items (arcname, path) into a compressed tar, reading each file once.
+    Files whose manifest digest is still None are hashed from the same buffers
+    tarfile copies into the archive. Entries that vanished since the scan, or that
+    tar can't store (sockets), are dropped from the manifest.
+
+    Members are packed into independently compressed blocks of about
+    INDEX_BLOCK_SIZE bytes (larger for multi-threaded zstd); the returned index maps
+    every member to its block.
+    """
+    members = []
+    target = archive_codecs.block_size(codec, threads, INDEX_BLOCK_SIZE)
+    with archive_codecs.BlockWriter(archive_path, codec, level, threads) as raw, \
+            tarfile.open(fileobj=raw, mode="w") as tar:
+        tar.copybufsize = HASH_BUFSIZE
+        for arc, path in items:
+            try:
+                info = tar.gettarinfo(path, arcname=arc)
+                if info is None:
+                    # a socket (or another type tar can't store) took the entry's place
+                    click.echo(f"Skipping special file: {path}")
+                    entries.pop(arc)
+                    continue
+                block = len(raw.blocks)
+                if info.isreg():
+                    with open(path, 'rb') as fp:
+                        if entries[arc][4] is None:
+                            hasher = hashlib.sha256()
+                            tar.addfile(info, _HashingReader(fp, hasher))
+                            entries[arc][4] = hasher.hexdigest()
+                        else:
+                            tar.addfile(info, fp)
+                else:
+                    tar.addfile(info)
+                    if entries[arc][4] is None:
+                        entries[arc][4] = hash_file(path)
+            except FileNotFoundError:
+                click.echo(f"Source vanished during backup: {path}")
+                entries.pop(arc)
+                continue
+            members.append([arc, block, info.type.decode(), info.size, int(info.mtime)])
+            if raw.block_size >= target:
+                raw.new_block()
+    return {'version': 1, 'codec': codec, 'blocks': raw.blocks, 'members': members}
+
+
+def index_path(archive: Path) -> Path:
+    return archive.with_name(re.sub(r"\.tar(\.\w+)?$", ".index.json", archive.name))
+
+
+def load_index(archive: Path) -> dict | None:
+    """
+    Sidecar index of an archive, or None for archives written before indexes existed.
+    """
+    path = index_path(archive)
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def backup_job(config_path: Path, job_name: str, verify: bool = False, hash_workers: int = 1) -> dict:
+    """
+    Archive the job's sources as a new version if anything changed since the last run.
+    Change detection uses the per-job manifest, so unchanged files are only stat'ed,
+    and changed files are hashed while they are archived. The archive is written to a
+    temp file and only kept if the resulting digest differs from the last one.
+    verify=True rehashes every byte up front instead of trusting the manifest.
+
+    Returns run stats: job, status ('created' or 'unchanged'), seconds, bytes_read
+    and bytes_written.
+    """
+    started = time.perf_counter()
+    result = {'job': job_name, 'status': 'unchanged', 'seconds': 0.0, 'bytes_read': 0, 'bytes_written': 0}
+
+    def finish(status: str) -> dict:
+        result['status'] = status
+        result['seconds'] = time.perf_counter() - started
+        return result
+
     config = load_config(config_path)
     job = get_job(config, job_name)
     if not job:
@@ -58,38 +381,315 @@ def backup_job(config_path: Path, job_name: str) -> None:
     dest.mkdir(parents=True, exist_ok=True)
     sources = [Path(os.path.expandvars(s)).expanduser() for s in job.get('source', [])]
 
-    # state file to track last hash
+    # state file to track last hash, manifest to avoid rehashing unchanged files
     state_file = dest / f".{job_name}.hash"
-    current_hash = compute_sources_hash(sources)
+    manifest_file = dest / f".{job_name}.manifest.json"
+    previous, manifest_ver = load_manifest(manifest_file)
     prev_hash = state_file.read_text().strip() if state_file.exists() else None
-    if prev_hash == current_hash:
-        click.echo(f"No changes detected for '{job_name}', skipping backup.")
-        return
+    scanned = scan_sources(sources)
+    paths = {arc: path for arc, path, _ in scanned}
+    entries, stale = update_manifest(scanned, previous, verify=verify,
+                                     workers=hash_workers, hash_stale=verify)
+    if verify:
+        result['bytes_read'] += sum(entries[arc][1] for arc in stale if entries[arc][0] == 'f')
+        silent = [arc for arc in stale if arc in previous and previous[arc][:4] == entries[arc][:4]
+                  and previous[arc][4] != entries[arc][4]]
+        if silent:
+            click.echo(f"{len(silent)} file(s) changed content without a stat change, e.g. {silent[0]}")
 
     # find next version
-    pattern = re.compile(rf"{re.escape(job_name)}-(\d+)\.tar\.gz$")
-    versions = [int(m.group(1)) for f in dest.iterdir() if (m := pattern.match(f.name))]
-    next_ver = max(versions) + 1 if versions else 1
-    archive_path = dest / f"{job_name}-{next_ver}.tar.gz"
-
-    # create archive
-    with tarfile.open(archive_path, "w:gz") as tar:
-        for src in sources:
-            if not src.exists():
-                click.echo(f"Source not found: {src}")
-                continue
-            try:
-                arcname = src.relative_to(Path.home())
-            except ValueError:
-                arcname = src.name
-            tar.add(str(src), arcname=str(arcname))
+    versions = list_versions(dest, job_name)
+    prev_ver = versions[-1][0] if versions else None
+    next_ver = prev_ver + 1 if prev_ver else 1
+    chunked = job.get('format') == 'chunked'
+
+    # incremental only on top of the version the manifest describes, with a full snapshot
+    # every `full_every` versions so restore chains stay short
+    incremental = (
+        not chunked
+        and job.get('mode') == 'incremental'
+        and prev_ver is not None
+        and not versions[-1][1].name.endswith('.chunks.json')
+        and manifest_ver == prev_ver
+        and len(version_chain(dest, job_name, prev_ver)) < job.get('full_every', DEFAULT_FULL_EVERY)
+    )
+
+    pending = [arc for arc in stale if entries[arc][4] is None]
+    if pending and not chunked and not incremental:
+        total = sum(e[1] for e in entries.values() if e[0] == 'f')
+        if sum(entries[arc][1] for arc in pending) < total * SINGLE_PASS_RATIO:
+            fill_digests(entries, pending, paths, hash_workers)
+            result['bytes_read'] += sum(entries[arc][1] for arc in pending)
+            pending = []
+
+    def unchanged() -> bool:
+        if tree_digest(entries) != prev_hash:
+            return False
+        if stale:
+            # content is unchanged, but remember the new stats so they aren't rehashed again
+            save_manifest(manifest_file, entries, manifest_ver)
+        click.echo(f"No changes detected for '{job_name}', skipping backup.")
+        return True
+
+    if not pending and unchanged():
+        return finish('unchanged')
+
+    if chunked:
+        # every chunked version is a complete snapshot; only new chunks cost space
+        version_file = dest / f"{job_name}-{next_ver}.chunks.json"
+        tmp_file = dest / f".{version_file.name}.tmp"
+        prev_entries = {}
+        if versions and versions[-1][1].name.endswith('.chunks.json'):
+            prev_entries = chunk_store.load_version(versions[-1][1])
+        written, read = chunk_store.write_version(dest / 'chunks', tmp_file, scanned, entries, prev_entries)
+        result['bytes_read'] += read
+        result['bytes_written'] += written + tmp_file.stat().st_size
+        if unchanged():
+            tmp_file.unlink()
+            return finish('unchanged')
+        os.replace(tmp_file, version_file)
+        with open(version_meta_path(dest, job_name, next_ver), 'w') as f:
+            json.dump({'type': 'full', 'format': 'chunked'}, f)
+        save_manifest(manifest_file, entries, next_ver)
+        state_file.write_text(tree_digest(entries))
+        click.echo(f"Backup created: {version_file} ({written} new bytes in chunk store)")
+        return finish('created')
+
+    if incremental:
+        members, _ = diff_manifests(previous, entries)
+    else:
+        members = sorted(entries)
+
+    # pick the codec, falling back to store-only when the payload is already compressed
+    compression = archive_codecs.parse_compression(job.get('compression'))
+    codec = compression['codec']
+    sizes = {arc: entries[arc][1] for arc in members if entries[arc][0] == 'f'}
+    if codec != 'none' and archive_codecs.mostly_incompressible(sizes):
+        codec = 'none'
+    archive_path = dest / f"{job_name}-{next_ver}{archive_codecs.SUFFIXES[codec]}"
+    tmp_path = dest / f".{archive_path.name}.tmp"
+
+    # create archive, hashing stale files on the way through
+    try:
+        index = write_tar(tmp_path, [(arc, paths[arc]) for arc in members], entries,
+                          codec, compression['level'], compression['threads'])
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    result['bytes_read'] += sum(m[3] for m in index['members'] if m[2] == tarfile.REGTYPE.decode())
+    result['bytes_written'] += tmp_path.stat().st_size
+    if unchanged():
+        tmp_path.unlink()
+        return finish('unchanged')
+    os.replace(tmp_path, archive_path)
+    with open(index_path(archive_path), 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    members = [arc for arc in members if arc in entries]
+    if incremental:
+        meta = {'type': 'incremental', 'base': prev_ver, 'files': members,
+                'deleted': sorted(arc for arc in previous if arc not in entries)}
+    else:
+        meta = {'type': 'full'}
+    with open(version_meta_path(dest, job_name, next_ver), 'w') as f:
+        json.dump(meta, f)
 
     # update state
-    state_file.write_text(current_hash)
-    click.echo(f"Backup created: {archive_path}")
+    save_manifest(manifest_file, entries, next_ver)
+    state_file.write_text(tree_digest(entries))
+    kind = f"incremental, {len(meta['files'])} changed, {len(meta['deleted'])} deleted" if incremental else "full"
+    click.echo(f"Backup created: {archive_path} ({kind}, {codec})")
+    return finish('created')
+
 
+def destination_device(job: dict) -> int:
+    """
+    st_dev of the job's destination, or of its nearest existing parent.
+    """
+    path = Path(os.path.expandvars(job['destination'])).expanduser()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return path.stat().st_dev
+
+
+def _run_job_group(config_path: Path, job_names: list[str], verify: bool, hash_workers: int) -> list[dict]:
+    """
+    Run jobs one after another; used as a process-pool task for jobs sharing a device.
+    A job that fails for any reason is reported and recorded, and the next one runs.
+    """
+    results = []
+    for name in job_names:
+        try:
+            results.append(backup_job(config_path, name, verify=verify, hash_workers=hash_workers))
+        except click.Abort:
+            click.echo(f"Backup of '{name}' failed.")
+            results.append(_failed(name, ''))
+        except Exception as e:
+            click.echo(f"Backup of '{name}' failed: {e}")
+            results.append(_failed(name, str(e) or type(e).__name__))
+    return results
+
+
+def _failed(name: str, error: str) -> dict:
+    return {'job': name, 'status': 'failed', 'seconds': 0.0, 'bytes_read': 0, 'bytes_written': 0, 'error': error}
+
+
+def format_bytes(n: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def backup_all(config_path: Path, jobs: int | None = None, verify: bool = False, hash_workers: int = 1) -> list[dict]:
+    """
+    Run every job in the config on a process pool of `jobs` workers. Jobs whose
+    destinations are on the same device run sequentially in one worker so they
+    don't compete for the same disk. Prints a summary table and returns the stats.
+    """
+    # only this command needs them; importing them here keeps CLI startup fast
+    from concurrent.futures import ProcessPoolExecutor
+    from tabulate import tabulate
 
-def restore_job(config_path: Path, job_name: str, version: int = None) -> None:
+    config = load_config(config_path)
+    names = [job['name'] for job in config.get('bk_jobs', [])]
+    if not names:
+        click.echo("No jobs defined in config.")
+        raise click.Abort()
+
+    groups = {}
+    for job in config['bk_jobs']:
+        groups.setdefault(destination_device(job), []).append(job['name'])
+
+    workers = min(jobs or len(groups), len(groups))
+    results = []
+    if workers <= 1:
+        for group in groups.values():
+            results.extend(_run_job_group(config_path, group, verify, hash_workers))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(group, pool.submit(_run_job_group, config_path, group, verify, hash_workers))
+                       for group in groups.values()]
+            for group, future in futures:
+                try:
+                    results.extend(future.result())
+                except Exception as e:  # the worker process itself died
+                    click.echo(f"Backup worker for {', '.join(group)} failed: {e}")
+                    results.extend(_failed(name, str(e) or type(e).__name__) for name in group)
+    results.sort(key=lambda r: names.index(r['job']))
+
+    rows = [[r['job'], r['status'], f"{r['seconds']:.1f}", format_bytes(r['bytes_read']),
+             format_bytes(r['bytes_written']), r.get('error', '')] for r in results]
+    click.echo(tabulate(rows, headers=['Job', 'Status', 'Time (s)', 'Read', 'Written', 'Error']))
+    return results
+
+
+def path_matches(name: str, pattern: str) -> bool:
+    """
+    True if the archive path or one of its parent directories matches the glob.
+    """
+    parts = name.split('/')
+    return any(fnmatch.fnmatchcase('/'.join(parts[:i]), pattern) for i in range(1, len(parts) + 1))
+
+
+def _select(tar, wanted: set[str] | None = None, skip=frozenset(), pattern: str | None = None):
+    """
+    Yield the members of a streaming tar to extract. With `wanted`, reading stops
+    as soon as all of them were seen.
+    """
+    remaining = set(wanted) if wanted is not None else None
+    for member in tar:
+        if remaining is not None:
+            if member.name not in remaining:
+                continue
+            remaining.discard(member.name)
+        if member.name not in skip and (pattern is None or path_matches(member.name, pattern)):
+            yield member
+        if remaining is not None and not remaining:
+            return
+
+
+def extract_members(archive: Path, engine: RestoreEngine, wanted: set[str] | None = None,
+                    skip: set[str] = frozenset(), pattern: str | None = None) -> int:
+    """
+    Restore selected members of one archive through the engine: only `wanted` names
+    if given, never names in `skip`, and only paths matching the glob `pattern`. When
+    the archive has an index and not everything is wanted, directories are created up
+    front and only the blocks holding selected members are read and decompressed.
+    Returns the number of members selected.
+    """
+    index = load_index(archive)
+    if index is None or (wanted is None and pattern is None):
+        with archive_codecs.open_reader(archive) as raw:
+            return engine.extract_tar(raw, lambda tar: _select(tar, wanted, skip, pattern))
+
+    by_block = {}
+    for name, block, *_ in index['members']:
+        if (wanted is None or name in wanted) and name not in skip \
+                and (pattern is None or path_matches(name, pattern)):
+            by_block.setdefault(block, set()).add(name)
+    engine.make_dirs(set().union(*by_block.values()))
+    # read runs of consecutive blocks as one region
+    runs = []
+    for block in sorted(by_block):
+        if runs and runs[-1][-1] == block - 1:
+            runs[-1].append(block)
+        else:
+            runs.append([block])
+    count = 0
+    for run in runs:
+        offset = index['blocks'][run[0]][0]
+        end = sum(index['blocks'][run[-1]])
+        names = set().union(*(by_block[b] for b in run))
+        with archive_codecs.open_reader(archive, offset, end - offset, index['codec']) as raw:
+            count += engine.extract_tar(raw, lambda tar: _select(tar, names))
+    return count
+
+
+def pick_version(archives: list[tuple[int, Path]], version: int | None) -> tuple[int, Path]:
+    if version is None:
+        return archives[-1]
+    matches = [item for item in archives if item[0] == version]
+    if not matches:
+        click.echo(f"No archive version {version} found.")
+        raise click.Abort()
+    return matches[0]
+
+
+def restore_plan(dest: Path, job_name: str, archives: list[tuple[int, Path]],
+                 version: int) -> list[tuple[Path, set[str] | None, set[str]]]:
+    """
+    Replay the chain of a tar version newest first, so every path comes from the
+    newest version that has it and paths deleted later are never picked.
+    Returns (archive, wanted names or None for all, names to skip), oldest first.
+    """
+    paths = dict(archives)
+    claimed, deleted = set(), set()
+    plan = []
+    for v in reversed(version_chain(dest, job_name, version)):
+        if v not in paths:
+            click.echo(f"Archive for version {v} is missing, needed to restore version {version}.")
+            raise click.Abort()
+        meta = load_version_meta(dest, job_name, v)
+        if meta.get('type') == 'incremental':
+            wanted = set(meta['files']) - claimed - deleted
+            if wanted:
+                plan.append((paths[v], wanted, frozenset()))
+            claimed |= set(meta['files'])
+            deleted |= set(meta['deleted'])
+        else:
+            plan.append((paths[v], None, claimed | deleted))
+    return plan[::-1]
+
+
+def restore_job(config_path: Path, job_name: str, version: int = None, pattern: str | None = None,
+                target: Path | None = None, dry_run: bool = False, workers: int = 4) -> dict:
+    """
+    Restore a version of a job into target (default $HOME), optionally only paths
+    matching a glob, writing files on `workers` threads. With dry_run the archives
+    are read but nothing is written. Returns the engine's stats.
+    """
     config = load_config(config_path)
     job = get_job(config, job_name)
     if not job:
@@ -97,23 +697,69 @@ def restore_job(config_path: Path, job_name: str, version: int = None) -> None:
         raise click.Abort()
 
     dest = Path(os.path.expandvars(job['destination'])).expanduser()
-    pattern = re.compile(rf"{re.escape(job_name)}-(\d+)\.tar\.gz$")
-    archives = [(int(m.group(1)), f) for f in dest.iterdir() if (m := pattern.match(f.name))]
+    archives = list_versions(dest, job_name)
     if not archives:
         click.echo(f"No backups found in {dest}")
         raise click.Abort()
-    archives.sort(key=lambda x: x[0])
+    ver, archive_file = pick_version(archives, version)
 
-    if version is None:
-        ver, archive_file = archives[-1]
+    target = Path(target).expanduser() if target else Path.home()
+    engine = RestoreEngine(target, workers=workers, dry_run=dry_run)
+    select = (lambda name: path_matches(name, pattern)) if pattern else None
+    try:
+        if archive_file.name.endswith('.chunks.json'):
+            count = chunk_store.restore_version(dest / 'chunks', archive_file, engine, select)
+        else:
+            count = sum(extract_members(archive, engine, wanted=wanted, skip=skip, pattern=pattern)
+                        for archive, wanted, skip in restore_plan(dest, job_name, archives, ver))
+    finally:
+        stats = engine.close()
+    if pattern and not count:
+        click.echo(f"Nothing in version {ver} matches '{pattern}'.")
+        return stats
+    summary = f"{stats['files']} files, {stats['dirs']} dirs, {stats['links']} links, {format_bytes(stats['bytes'])}"
+    if dry_run:
+        click.echo(f"Would restore version {ver} for job '{job_name}' into {target}: {summary}.")
     else:
-        matches = [item for item in archives if item[0] == version]
-        if not matches:
-            click.echo(f"No archive version {version} found.")
-            raise click.Abort()
-        ver, archive_file = matches[0]
+        click.echo(f"Restored version {ver} for job '{job_name}' into {target}: {summary}.")
+    return stats
 
-    with tarfile.open(archive_file, "r:gz") as tar:
-        tar.extractall(path=Path.home())
-    click.echo(f"Restored version {ver} for job '{job_name}'.")
 
+def list_job(config_path: Path, job_name: str, version: int = None) -> None:
+    """
+    Print the contents of a version from its index sidecars only, never the archives.
+    """
+    config = load_config(config_path)
+    job = get_job(config, job_name)
+    if not job:
+        click.echo(f"No job named '{job_name}' in config.")
+        raise click.Abort()
+
+    dest = Path(os.path.expandvars(job['destination'])).expanduser()
+    archives = list_versions(dest, job_name)
+    if not archives:
+        click.echo(f"No backups found in {dest}")
+        raise click.Abort()
+    ver, archive_file = pick_version(archives, version)
+
+    rows = {}
+    if archive_file.name.endswith('.chunks.json'):
+        for name, item in chunk_store.load_version(archive_file).items():
+            kind = {'d': tarfile.DIRTYPE, 'l': tarfile.SYMTYPE}.get(item['kind'], tarfile.REGTYPE).decode()
+            rows[name] = (kind, item.get('size', 0), item['mtime_ns'] // 1_000_000_000)
+    else:
+        for archive, wanted, skip in restore_plan(dest, job_name, archives, ver):
+            index = load_index(archive)
+            if index is None:
+                click.echo(f"{archive.name} has no index; only versions written since indexes were added can be listed.")
+                raise click.Abort()
+            for name, _, kind, size, mtime in index['members']:
+                if (wanted is None or name in wanted) and name not in skip:
+                    rows[name] = (kind, size, mtime)
+
+    for name in sorted(rows):
+        kind, size, mtime = rows[name]
+        stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))
+        suffix = '/' if kind == tarfile.DIRTYPE.decode() else ''
+        click.echo(f"{size:>14}  {stamp}  {name}{suffix}")
+    click.echo(f"{len(rows)} entries in version {ver} of '{job_name}'.")
@@ -0,0 +1,185 @@
+# src/pythonkitchen/backup_watch.py
+
+import os
+import time
+import threading
+from pathlib import Path
+import click
+from pythonkitchen.backup_jobs import load_config, get_job, backup_job, scan_sources
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # fall back to periodic stat scans
+    Observer = None
+    FileSystemEventHandler = object
+
+# seconds a job must stay quiet after its last change before it is backed up
+DEFAULT_DEBOUNCE = 10.0
+# seconds between stat scans when no event backend is available
+DEFAULT_POLL_INTERVAL = 300.0
+
+
+def _expand(path: str) -> str:
+    return os.path.abspath(os.path.expanduser(os.path.expandvars(path)))
+
+
+class DirtyJobs:
+    """
+    Thread-safe dirty flag per job, with the time of its last change. Events only decide
+    when a job runs: backup_job itself finds what changed with a full stat walk of the
+    sources against the previous manifest.
+    """
+    def __init__(self, jobs: dict[str, dict]):
+        self.sources = {name: [_expand(s) for s in job.get('source', [])] for name, job in jobs.items()}
+        self.destinations = [_expand(job['destination']) for job in jobs.values()]
+        self.pending = set()
+        self.last_change = {}
+        self.wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def mark(self, path: str) -> None:
+        path = os.path.abspath(path)
+        # our own archives landing inside a watched tree must not retrigger backups
+        if any(path == d or path.startswith(d + os.sep) for d in self.destinations):
+            return
+        now = time.monotonic()
+        with self._lock:
+            for name, sources in self.sources.items():
+                if any(path == s or path.startswith(s + os.sep) for s in sources):
+                    self.pending.add(name)
+                    self.last_change[name] = now
+                    self.wake.set()
+
+    def retry(self, name: str) -> None:
+        """
+        Mark a job dirty again, e.g. after a failed backup; it runs once the debounce passes.
+        """
+        with self._lock:
+            self.pending.add(name)
+            self.last_change[name] = time.monotonic()
+            self.wake.set()
+
+    def take_ready(self, debounce: float) -> tuple[list[str], float | None]:
+        """
+        Pop the jobs that have been quiet for `debounce` seconds. Also returns how long
+        to wait until the next pending job is due, or None when nothing is pending.
+        """
+        now = time.monotonic()
+        ready, wait = [], None
+        with self._lock:
+            self.wake.clear()
+            for name in [n for n in self.sources if n in self.pending]:
+                due = self.last_change[name] + debounce - now
+                if due <= 0:
+                    ready.append(name)
+                    self.pending.discard(name)
+                else:
+                    wait = due if wait is None else min(wait, due)
+        return ready, wait
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, dirty: DirtyJobs):
+        super().__init__()
+        self.dirty = dirty
+
+    def on_any_event(self, event):
+        if event.event_type in ('opened', 'closed_no_write'):
+            return
+        self.dirty.mark(event.src_path)
+        if getattr(event, 'dest_path', ''):
+            self.dirty.mark(event.dest_path)
+
+
+def _poll(dirty: DirtyJobs, jobs: dict[str, dict], interval: float, stop: threading.Event) -> None:
+    """
+    Fallback change detection: stat-scan every source each interval and mark what moved.
+    """
+    def snapshot(job):
+        sources = [Path(s) for s in dirty.sources[job]]
+        return {path: (st.st_size, st.st_mtime_ns, st.st_ino) for _, path, st in scan_sources(sources)}
+
+    seen = {name: {} for name in jobs}
+    for name in jobs:
+        try:
+            seen[name] = snapshot(name)
+        except OSError as e:
+            click.echo(f"Scanning '{name}' failed: {e}")
+    while not stop.wait(interval):
+        for name in jobs:
+            # files change under the scan; a failed pass must not end change detection
+            try:
+                current = snapshot(name)
+            except OSError as e:
+                click.echo(f"Scanning '{name}' failed, retrying in {interval:g}s: {e}")
+                continue
+            for path in current.keys() ^ seen[name].keys():
+                dirty.mark(path)
+            for path, key in current.items():
+                if seen[name].get(path, key) != key:
+                    dirty.mark(path)
+            seen[name] = current
+
+
+def watch_jobs(config_path: Path, job_names: list[str] | None = None, debounce: float = DEFAULT_DEBOUNCE,
+               poll_interval: float = DEFAULT_POLL_INTERVAL, hash_workers: int = 1) -> None:
+    """
+    Back up jobs continuously: filesystem events (watchdog, i.e. inotify/FSEvents) or,
+    without watchdog, periodic stat scans mark jobs dirty, and a job is backed up once
+    it has been quiet for `debounce` seconds. Between changes the loop just blocks.
+    Each backup is a normal backup_job run, with its full stat walk of the sources.
+    """
+    config = load_config(config_path)
+    names = job_names or [job['name'] for job in config.get('bk_jobs', [])]
+    jobs = {}
+    for name in names:
+        job = get_job(config, name)
+        if not job:
+            click.echo(f"No job named '{name}' in config.")
+            raise click.Abort()
+        jobs[name] = job
+    if not jobs:
+        click.echo("No jobs defined in config.")
+        raise click.Abort()
+
+    dirty = DirtyJobs(jobs)
+    stop = threading.Event()
+    observer = None
+    if Observer is not None:
+        observer = Observer()
+        handler = _EventHandler(dirty)
+        for source in {s for sources in dirty.sources.values() for s in sources}:
+            if not os.path.exists(source):
+                click.echo(f"Source not found: {source}")
+                continue
+            watched = source if os.path.isdir(source) else os.path.dirname(source)
+            observer.schedule(handler, watched, recursive=os.path.isdir(source))
+        observer.start()
+        click.echo(f"Watching {len(jobs)} job(s) for changes. Ctrl+C to stop.")
+    else:
+        threading.Thread(target=_poll, args=(dirty, jobs, poll_interval, stop), daemon=True).start()
+        click.echo(f"watchdog is not installed; scanning {len(jobs)} job(s) every {poll_interval:g}s. "
+                   "Ctrl+C to stop.")
+
+    try:
+        wait = None
+        while True:
+            dirty.wake.wait(wait)
+            ready, wait = dirty.take_ready(debounce)
+            for name in ready:
+                try:
+                    backup_job(config_path, name, hash_workers=hash_workers)
+                except click.Abort:
+                    click.echo(f"Backup of '{name}' failed. Retrying after {debounce:g}s.")
+                    dirty.retry(name)
+                except Exception as e:  # one bad backup must not end the daemon
+                    click.echo(f"Backup of '{name}' failed: {e}. Retrying after {debounce:g}s.")
+                    dirty.retry(name)
+    except KeyboardInterrupt:
+        click.echo("Stopping watch.")
+    finally:
+        stop.set()
+        if observer is not None:
+            observer.stop()
+            observer.join()
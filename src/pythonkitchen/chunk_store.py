@@ -0,0 +1,235 @@
+# src/pythonkitchen/chunk_store.py
+
+import os
+import json
+import stat
+import zlib
+import hashlib
+import click
+from pathlib import Path
+
+# numpy is imported on first use (see _numpy), so importing this module stays cheap
+_np = None
+
+# content-defined chunking: cut where a rolling hash over the last WINDOW bytes hits
+# the mask, but never before MIN_CHUNK or after MAX_CHUNK bytes (~1 MiB average)
+WINDOW = 48
+MIN_CHUNK = 256 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+MASK_BITS = 20
+# bytes read per call; with at most MAX_CHUNK retained the buffer stays under 3 * MAX_CHUNK
+READ_SIZE = 2 * MAX_CHUNK
+# the numpy boundary search hashes this many bytes at a time (~8 uint64s of scratch per byte)
+SCAN_BLOCK = 1024 * 1024
+
+_M64 = (1 << 64) - 1
+_MIX = 0x9E3779B97F4A7C15
+_THRESHOLD = 1 << (64 - MASK_BITS)
+# one pseudo-random 64-bit value per byte value, fixed so cut points never move
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'little') for i in range(256)]
+
+
+def _numpy():
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # pure-python boundary search, same cut points, much slower
+            _np = False
+    return _np or None
+
+
+def _candidates(buf: bytes) -> list[int]:
+    """
+    Offsets (exclusive chunk ends) in buf where the rolling hash allows a cut.
+    The hash is the wrapping sum of GEAR values over the last WINDOW bytes, mixed
+    with a multiplicative constant.
+    """
+    if len(buf) < WINDOW:
+        return []
+    np = _numpy()
+    if np is not None:
+        gear = np.array(GEAR, dtype=np.uint64)
+        data = np.frombuffer(buf, dtype=np.uint8)
+        out = []
+        # SCAN_BLOCK windows per pass, each pass re-reading the WINDOW - 1 bytes before it
+        for lo in range(0, len(buf) - WINDOW + 1, SCAN_BLOCK):
+            sums = np.cumsum(gear[data[lo:lo + SCAN_BLOCK + WINDOW - 1]], dtype=np.uint64)
+            window = sums[WINDOW - 1:].copy()
+            window[1:] -= sums[:-WINDOW]
+            hits = np.flatnonzero(window * np.uint64(_MIX) < np.uint64(_THRESHOLD))
+            out.extend((hits + lo + WINDOW).tolist())
+        return out
+    out = []
+    acc = 0
+    for i, b in enumerate(buf):
+        acc = (acc + GEAR[b]) & _M64
+        if i >= WINDOW:
+            acc = (acc - GEAR[buf[i - WINDOW]]) & _M64
+        if i >= WINDOW - 1 and (acc * _MIX) & _M64 < _THRESHOLD:
+            out.append(i + 1)
+    return out
+
+
+def iter_chunks(fp):
+    """
+    Split a binary stream into content-defined chunks. Inserting or removing bytes
+    only changes the chunks around the edit, so the rest deduplicate.
+    """
+    buf = b''
+    cuts = []
+    eof = False
+    while True:
+        if not eof and len(buf) < MAX_CHUNK:
+            data = fp.read(READ_SIZE)
+            eof = not data
+            if data:
+                # hash only the new bytes, seeded with the WINDOW - 1 retained before them;
+                # a cut point depends on nothing else, so the retained tail needs no rescan
+                base = max(len(buf) - WINDOW + 1, 0)
+                buf += data
+                cuts = [base + cut for cut in _candidates(buf[base:])]
+        if not buf:
+            return
+        start = 0
+        for cut in cuts:
+            if cut - start < MIN_CHUNK:
+                continue
+            while cut - start > MAX_CHUNK:
+                yield buf[start:start + MAX_CHUNK]
+                start += MAX_CHUNK
+            yield buf[start:cut]
+            start = cut
+        # keep the tail for the next read unless it can no longer grow
+        while len(buf) - start >= MAX_CHUNK:
+            yield buf[start:start + MAX_CHUNK]
+            start += MAX_CHUNK
+        buf = buf[start:]
+        cuts = []
+        if eof:
+            if buf:
+                yield buf
+            return
+
+
+def chunk_path(store: Path, digest: str) -> Path:
+    return store / digest[:2] / digest
+
+
+def put_chunk(store: Path, data: bytes) -> tuple[str, int]:
+    """
+    Store a chunk under its SHA256 unless it is already there.
+    Returns (digest, compressed bytes written, 0 when deduplicated).
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = chunk_path(store, digest)
+    if path.exists():
+        return digest, 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = zlib.compress(data, 6)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp, path)
+    return digest, len(payload)
+
+
+def get_chunk(store: Path, digest: str) -> bytes:
+    data = zlib.decompress(chunk_path(store, digest).read_bytes())
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f"Chunk {digest} is corrupt")
+    return data
+
+
+def store_file(store: Path, path: str) -> tuple[list[str], int, str]:
+    """
+    Chunk a file into the store, hashing the whole file in the same read.
+    Returns (chunk digests, bytes written to the store, file SHA256).
+    """
+    chunks = []
+    written = 0
+    h = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for data in iter_chunks(fp):
+            h.update(data)
+            digest, n = put_chunk(store, data)
+            chunks.append(digest)
+            written += n
+    return chunks, written, h.hexdigest()
+
+
+def load_version(version_file: Path) -> dict:
+    with open(version_file, 'r') as f:
+        return json.load(f).get('entries', {})
+
+
+def write_version(store: Path, version_file: Path, scanned: list, manifest: dict,
+                  previous: dict | None = None) -> tuple[int, int]:
+    """
+    Write one chunked version: every entry of the scan goes into a small JSON manifest,
+    and file contents go into the chunk store. Files whose content digest (from the stat
+    manifest) matches the previous version reuse its chunk list without being read.
+    Files with no digest yet are hashed while they are chunked, and the digest is
+    filled into the manifest. Entries that vanished since the scan are dropped from
+    both, and only regular files are ever opened. Returns (bytes added to the store,
+    bytes read from sources).
+    """
+    previous = previous or {}
+    entries = {}
+    written = 0
+    read = 0
+    for arc, path, st in scanned:
+        item = {'mode': stat.S_IMODE(st.st_mode), 'mtime_ns': st.st_mtime_ns}
+        try:
+            if stat.S_ISDIR(st.st_mode):
+                item['kind'] = 'd'
+            elif stat.S_ISLNK(st.st_mode):
+                item.update(kind='l', target=os.readlink(path))
+            elif stat.S_ISREG(st.st_mode):
+                digest = manifest[arc][4]
+                old = previous.get(arc)
+                if digest is not None and old and old.get('digest') == digest:
+                    chunks = old['chunks']
+                else:
+                    chunks, n, digest = store_file(store, path)
+                    manifest[arc][4] = digest
+                    written += n
+                    read += st.st_size
+                item.update(kind='f', size=st.st_size, digest=digest, chunks=chunks)
+            else:
+                click.echo(f"Skipping special file: {path}")
+                manifest.pop(arc, None)
+                continue
+        except FileNotFoundError:
+            click.echo(f"Source vanished during backup: {path}")
+            manifest.pop(arc, None)
+            continue
+        entries[arc] = item
+    tmp = version_file.with_name(version_file.name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'version': 1, 'entries': entries}, f, separators=(',', ':'))
+    os.replace(tmp, version_file)
+    return written, read
+
+
+def restore_version(store: Path, version_file: Path, engine, select=None) -> int:
+    """
+    Hand the entries of a chunked version to a restore engine, all of them or those
+    for which select(arcname) is true. Chunks are read on the engine's writer threads.
+    Returns the number of entries selected.
+    """
+    entries = load_version(version_file)
+    if select is not None:
+        entries = {arc: item for arc, item in entries.items() if select(arc)}
+    engine.make_dirs(entries)
+    for arc in sorted(entries):
+        item = entries[arc]
+        if item['kind'] == 'd':
+            engine.make_dir(arc, item['mode'], item['mtime_ns'])
+        elif item['kind'] == 'l':
+            engine.make_link(arc, item['target'])
+        else:
+            chunks = (get_chunk(store, digest) for digest in item['chunks'])
+            engine.write_file(arc, item['size'], item['mode'], item['mtime_ns'], chunks)
+    return len(entries)
@@ -1,10 +1,14 @@
 # src/pythonkitchen/cli.py
 
+# Commands import their modules (and those modules' heavy dependencies) inside the
+# command body, so `pythonkitchen --help` and each command only pay for what they use.
+# Keep module-level imports here to the standard library and click.
+
 import os
 import sys
+import time
 import click
 from pathlib import Path
-from pythonkitchen.backup_jobs import backup_job, restore_job
 
 
 def get_dropbox_dir() -> Path:
@@ -27,10 +31,59 @@ def get_dropbox_dir() -> Path:
         return Path.home() / 'Dropbox'
 
 
-# Path to your backup configuration JSON
-CONFIG_PATH = get_dropbox_dir() / 'matrix' / 'backups' / 'backup_config.json'
+def get_config_path() -> Path:
+    """
+    Path to your backup configuration JSON.
+    """
+    return get_dropbox_dir() / 'matrix' / 'backups' / 'backup_config.json'
+
+
+def parse_importtime(lines):
+    """
+    (self us, cumulative us, depth, module) for each `-X importtime` line; other lines are skipped.
+    """
+    rows = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(fields[0]), int(fields[1]), depth, name.strip()))
+    return rows
+
+
+def profile_startup(ctx, param, value):
+    """
+    Re-run this command line under `python -X importtime` and report the slowest imports.
+    """
+    if not value or ctx.resilient_parsing:
+        return
+    import subprocess
+    args = [a for a in sys.argv[1:] if a != '--profile-startup']
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'pythonkitchen.cli', *args],
+                          stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    lines = proc.stderr.splitlines()
+    other = [line for line in lines if not line.startswith('import time:')]
+    if other:
+        click.echo("\n".join(other), err=True)
+
+    rows = parse_importtime(lines)
+    total = sum(cumulative for _, cumulative, depth, _ in rows if depth == 0)
+    click.echo("\nStartup imports, slowest first by cumulative time (self | cumulative | module):", err=True)
+    for self_us, cumulative, depth, name in sorted(rows, key=lambda r: -r[1])[:20]:
+        click.echo(f"{self_us / 1000:9.1f} ms | {cumulative / 1000:9.1f} ms | {'  ' * depth}{name}", err=True)
+    click.echo(f"Imports: {total / 1000:.1f} ms in {len(rows)} modules; whole run: {wall * 1000:.1f} ms.", err=True)
+    ctx.exit(proc.returncode)
+
 
 @click.group()
+@click.option('--profile-startup', is_flag=True, expose_value=False, is_eager=True, callback=profile_startup,
+              help='Run the command under `python -X importtime` and print the slowest imports.')
 def main():
     """
     PythonKitchen CLI: backup and restore tasks defined in config.
@@ -38,17 +91,59 @@ def main():
     pass
 
 @main.command()
-@click.option('--job', 'job_name', required=True, help='Name of the job defined in config.')
-def backup(job_name):
-    """Create a new versioned backup for the given job."""
-    backup_job(CONFIG_PATH, job_name)
+@click.option('--job', 'job_name', default=None, help='Name of the job defined in config.')
+@click.option('--all', 'run_all', is_flag=True, default=False, help='Back up every job in the config.')
+@click.option('--jobs', type=click.IntRange(min=1), default=None,
+              help='With --all: jobs to run in parallel (default: one per destination device).')
+@click.option('--verify', is_flag=True, default=False,
+              help='Rehash every file instead of trusting the stat manifest.')
+@click.option('--hash-workers', type=click.IntRange(min=1), default=4, show_default=True,
+              help='Threads used to hash changed files.')
+@click.option('--watch', is_flag=True, default=False,
+              help='Keep running and back up jobs (all, or --job) whenever their sources change.')
+@click.option('--debounce', type=float, default=10.0, show_default=True,
+              help='With --watch: seconds a job must be quiet before it is backed up.')
+@click.option('--poll-interval', type=float, default=300.0, show_default=True,
+              help='With --watch and no watchdog package: seconds between stat scans.')
+def backup(job_name, run_all, jobs, verify, hash_workers, watch, debounce, poll_interval):
+    """Create a new versioned backup for the given job, or for all jobs."""
+    if watch:
+        from pythonkitchen.backup_watch import watch_jobs
+        watch_jobs(get_config_path(), [job_name] if job_name else None, debounce=debounce,
+                   poll_interval=poll_interval, hash_workers=hash_workers)
+        return
+    if run_all == bool(job_name):
+        raise click.UsageError("Pass exactly one of --job or --all.")
+    from pythonkitchen.backup_jobs import backup_job, backup_all
+    if run_all:
+        backup_all(get_config_path(), jobs=jobs, verify=verify, hash_workers=hash_workers)
+    else:
+        backup_job(get_config_path(), job_name, verify=verify, hash_workers=hash_workers)
 
 @main.command()
 @click.option('--job', 'job_name', required=True, help='Name of the job defined in config.')
 @click.option('--version', type=int, default=None, help='Version number to restore (default: latest).')
-def restore(job_name, version):
+@click.option('--path', 'pattern', default=None,
+              help="Only restore archive paths matching this glob, e.g. 'proj/config/*'.")
+@click.option('--target', type=click.Path(file_okay=False), default=None,
+              help='Directory to restore into (default: your home directory).')
+@click.option('--dry-run', is_flag=True, default=False,
+              help='Read the archives and report what would be restored, without writing.')
+@click.option('--workers', type=click.IntRange(min=1), default=4, show_default=True,
+              help='Threads writing restored files.')
+def restore(job_name, version, pattern, target, dry_run, workers):
     """Restore files for a given job and version."""
-    restore_job(CONFIG_PATH, job_name, version)
+    from pythonkitchen.backup_jobs import restore_job
+    restore_job(get_config_path(), job_name, version, pattern=pattern, target=target,
+                dry_run=dry_run, workers=workers)
+
+@main.command("list")
+@click.option('--job', 'job_name', required=True, help='Name of the job defined in config.')
+@click.option('--version', type=int, default=None, help='Version number to list (default: latest).')
+def list_cmd(job_name, version):
+    """List the files in a backup version, reading only its index."""
+    from pythonkitchen.backup_jobs import list_job
+    list_job(get_config_path(), job_name, version)
 
 @main.command("export-project")
 @click.option(
@@ -67,18 +162,58 @@ def restore(job_name, version):
     "--include-env", is_flag=True, default=False,
     help="Include .env files in export."
 )
-def export_project_cli(root, output_path, include_env, include_list):
+@click.option(
+    "--no-ignore", "no_ignore", is_flag=True, default=False,
+    help="Do not honour .gitignore/.ignore files."
+)
+@click.option(
+    "--max-tokens", "max_tokens", type=click.IntRange(min=1), default=None,
+    help="Approximate token budget; the most relevant files are kept, others cut or left out."
+)
+@click.option(
+    "--max-bytes-per-file", "max_bytes_per_file", type=click.IntRange(min=1), default=None,
+    help="Larger files are exported as a head/tail excerpt of this many bytes."
+)
+@click.option(
+    "--workers", type=click.IntRange(min=1), default=8, show_default=True,
+    help="Threads reading files for the export."
+)
+@click.option(
+    "--no-cache", "no_cache", is_flag=True, default=False,
+    help="Read every file again instead of copying unchanged blocks from the previous --output file."
+)
+@click.option(
+    "--incremental", is_flag=True, default=False,
+    help="Patch an existing --output file, rewriting only the sections that changed."
+)
+@click.option(
+    "--format", "output_format", type=click.Choice(["markdown", "ndjson"]), default="markdown", show_default=True,
+    help="ndjson streams only the tree, one JSON record per entry (path, depth, type, size, mtime)."
+)
+def export_project_cli(root, output_path, include_env, include_list, no_ignore, max_tokens, max_bytes_per_file,
+                       workers, no_cache, incremental, output_format):
     """
     Exports the folder structure and all relevant project files for context.
     """
     from pythonkitchen.project_export import export_project
+    if incremental and not output_path:
+        raise click.UsageError("--incremental needs --output.")
+    if incremental and no_cache:
+        raise click.UsageError("--incremental cannot be combined with --no-cache.")
     # build a set of overrides (strip whitespace, ignore empty)
     overrides = {name.strip() for name in include_list.split(",") if name.strip()}
     export_project(
         root,
         output_path=output_path,
         include_env=include_env,
-        include_list=overrides
+        include_list=overrides,
+        use_ignore=not no_ignore,
+        max_tokens=max_tokens,
+        max_bytes_per_file=max_bytes_per_file,
+        use_cache=not no_cache,
+        workers=workers,
+        incremental=incremental,
+        output_format=output_format
     )
 
 @main.command("pypi-availability")
@@ -1,49 +1,324 @@
 import os
+import sys
+import json
+import stat
+import heapq
+import sqlite3
 import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
-def tree(path, prefix="", max_files=2, _is_root=True, show_hidden=False, max_depth=None, current_depth=1):
+# --du keeps what it learns about each directory here, keyed by the directory's mtime
+DU_CACHE = Path.home() / ".pythonkitchen" / "du_cache.sqlite"
+DU_TOP_K = 10
+DU_TOP_EXTS = 15
+
+def scan_dir(path, show_hidden=False):
+    """
+    Sorted (folders, files) names of one directory from a single os.scandir pass.
+    The type comes from the DirEntry, so each entry costs at most one stat (none
+    where the filesystem reports types with the listing).
+    """
+    folders, files = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            if not show_hidden and entry.name.startswith('.'):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            (folders if is_dir else files).append(entry.name)
+    folders.sort(key=str.lower)
+    files.sort(key=str.lower)
+    return folders, files
+
+
+def iter_tree(path, prefix="", max_files=2, show_hidden=False, max_depth=None, workers=None):
+    """
+    Yield the lines of tree() one at a time. With workers > 1, the subdirectories of
+    each directory are listed concurrently on a thread pool while lines are still
+    produced depth-first in the same order, which hides latency on network mounts.
+    """
+    pool = ThreadPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+
+    def walk(path, prefix, depth, pending):
+        try:
+            folders, files = pending.result() if pending is not None else scan_dir(path, show_hidden)
+        except PermissionError:
+            yield prefix + "[Permission Denied]"
+            return
+
+        descend = max_depth is None or depth < max_depth
+        # start listing every sibling before descending into the first one
+        listings = [pool.submit(scan_dir, os.path.join(path, f), show_hidden) for f in folders] \
+            if pool is not None and descend else [None] * len(folders)
+
+        shown = files[:max_files]
+        # Print all folders (always)
+        for idx, folder in enumerate(folders):
+            is_last = (idx == len(folders) - 1) and (len(shown) == 0)
+            connector = "└── " if is_last else "├── "
+            yield prefix + connector + folder
+            extension = "    " if is_last else "│   "
+            if descend:
+                yield from walk(os.path.join(path, folder), prefix + extension, depth + 1, listings[idx])
+
+        # Print first N files
+        for idx, file in enumerate(shown):
+            is_last = (idx == len(shown) - 1)
+            connector = "└── " if is_last else "├── "
+            yield prefix + connector + file
+
+        extra = len(files) - max_files
+        if extra > 0:
+            yield prefix + f"┊ ... ({extra} more files)"
+
+    try:
+        yield from walk(path, prefix, 1, None)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def tree(path, prefix="", max_files=2, _is_root=True, show_hidden=False, max_depth=None, current_depth=1,
+         workers=None):
     if _is_root:
         print(path)
+    # one buffered writelines instead of a print() call per line
+    lines = iter_tree(path, prefix, max_files=max_files, show_hidden=show_hidden,
+                      max_depth=None if max_depth is None else max_depth - current_depth + 1,
+                      workers=workers)
+    sys.stdout.writelines(line + "\n" for line in lines)
+
+
+def entry_type(mode):
+    if stat.S_ISDIR(mode):
+        return "dir"
+    if stat.S_ISLNK(mode):
+        return "symlink"
+    if stat.S_ISREG(mode):
+        return "file"
+    return "other"
+
+
+def stat_record(rel, depth, st):
+    """
+    The NDJSON record of one entry: path relative to the root ('/'-separated), depth
+    (1 for the root's children), type, size in bytes and mtime in epoch seconds.
+    """
+    return {"path": rel, "depth": depth, "type": entry_type(st.st_mode), "size": st.st_size,
+            "mtime": st.st_mtime}
+
+
+def iter_records(path, show_hidden=False, max_depth=None):
+    """
+    One stat_record per entry, the root first (path ".", depth 0), in the order tree()
+    shows them: folders first, then files. Unlike tree(), every file is listed and
+    symlinks are reported rather than followed. Unreadable directories get an
+    {"path", "type": "error", "error"} record.
+    """
+    def walk(dir_path, rel_dir, depth):
+        try:
+            with os.scandir(dir_path) as it:
+                items = [(e, e.stat(follow_symlinks=False)) for e in it
+                         if show_hidden or not e.name.startswith('.')]
+        except OSError as e:
+            yield {"path": rel_dir or ".", "type": "error", "error": e.strerror or str(e)}
+            return
+        items.sort(key=lambda item: (not stat.S_ISDIR(item[1].st_mode), item[0].name.lower()))
+        for entry, st in items:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            yield stat_record(rel, depth, st)
+            if stat.S_ISDIR(st.st_mode) and (max_depth is None or depth < max_depth):
+                yield from walk(entry.path, rel, depth + 1)
+
+    yield stat_record(".", 0, os.stat(path))
+    yield from walk(path, "", 1)
+
+
+def write_ndjson(records, out=None):
+    """
+    Stream records to out (stdout by default) as JSON Lines, one buffered write per batch.
+    """
+    out = out or sys.stdout
+    out.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
 
+def human_size(n):
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if n < 1024 or unit == 'TiB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+class DuCache:
+    """
+    SQLite cache of each directory's own contents (direct files and subdirectory names).
+    A directory's mtime changes whenever an entry is added, removed or renamed in it,
+    so a record with a matching mtime can stand in for listing the directory. Files
+    rewritten in place don't touch their directory's mtime; use --refresh for those.
+    """
+    def __init__(self, path=DU_CACHE):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER, record TEXT)"
+        )
+
+    def get(self, path, mtime_ns):
+        row = self.db.execute("SELECT mtime_ns, record FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row is None or row[0] != mtime_ns:
+            return None
+        return json.loads(row[1])
+
+    def put(self, path, mtime_ns, record):
+        self.db.execute("INSERT OR REPLACE INTO dirs (path, mtime_ns, record) VALUES (?, ?, ?)",
+                        (path, mtime_ns, json.dumps(record, separators=(',', ':'))))
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def scan_own(path, top_k=DU_TOP_K):
+    """
+    Bytes, file count, extension histogram, largest files and subdirectory names of
+    one directory, not counting anything below it. Symlinks are counted, not followed.
+    """
+    record = {'bytes': 0, 'files': 0, 'subdirs': [], 'exts': {}, 'top': []}
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                record['subdirs'].append(entry.name)
+                continue
+            size = entry.stat(follow_symlinks=False).st_size
+            record['bytes'] += size
+            record['files'] += 1
+            ext = os.path.splitext(entry.name)[1].lower() or '(none)'
+            count, total = record['exts'].get(ext, (0, 0))
+            record['exts'][ext] = (count + 1, total + size)
+            if len(record['top']) < top_k:
+                heapq.heappush(record['top'], (size, entry.name))
+            else:
+                heapq.heappushpop(record['top'], (size, entry.name))
+    return record
+
+
+def disk_usage(path, cache=None, top_k=DU_TOP_K, refresh=False, stats=None):
+    """
+    Usage tree of path: {'name', 'bytes', 'files', 'own', 'children', 'error'} per
+    directory, with totals covering the whole subtree. A directory whose mtime matches
+    the cache costs one stat; only changed directories are listed again.
+    """
+    stats = stats if stats is not None else {'scanned': 0, 'cached': 0}
+    node = {'name': os.path.basename(path) or path, 'bytes': 0, 'files': 0, 'own': None,
+            'children': [], 'error': None}
     try:
-        entries = os.listdir(path)
-    except PermissionError:
-        print(prefix + "[Permission Denied]")
-        return
+        mtime_ns = os.stat(path).st_mtime_ns
+        own = None if cache is None or refresh else cache.get(path, mtime_ns)
+        # a cached record only knows its top files up to the K it was scanned with
+        if own is not None and len(own['top']) < min(top_k, own['files']):
+            own = None
+        if own is None:
+            own = scan_own(path, top_k)
+            stats['scanned'] += 1
+            if cache is not None:
+                cache.put(path, mtime_ns, own)
+        else:
+            stats['cached'] += 1
+    except OSError as e:
+        node['error'] = e.strerror or str(e)
+        return node
 
-    if not show_hidden:
-        entries = [e for e in entries if not e.startswith('.')]
-    entries = sorted(entries, key=lambda x: (not os.path.isdir(os.path.join(path, x)), x.lower()))
+    node['own'] = own
+    node['bytes'], node['files'] = own['bytes'], own['files']
+    for name in own['subdirs']:
+        child = disk_usage(os.path.join(path, name), cache, top_k, refresh, stats)
+        node['children'].append(child)
+        node['bytes'] += child['bytes']
+        node['files'] += child['files']
+    return node
 
-    folders = [e for e in entries if os.path.isdir(os.path.join(path, e))]
-    files = [e for e in entries if not os.path.isdir(os.path.join(path, e))]
 
-    # Print all folders (always)
-    for idx, folder in enumerate(folders):
-        is_last = (idx == len(folders) - 1) and (len(files[:max_files]) == 0)
+def iter_du_lines(node, prefix="", max_depth=None, current_depth=1):
+    """
+    Tree of directory totals, largest first, with each directory's own files folded into one line.
+    """
+    children = sorted(node['children'], key=lambda n: (-n['bytes'], n['name'].lower()))
+    own_files = node['own']['files'] if node['own'] else 0
+    for idx, child in enumerate(children):
+        is_last = idx == len(children) - 1 and not own_files
         connector = "└── " if is_last else "├── "
-        print(prefix + connector + folder)
-        extension = "    " if is_last else "│   "
+        if child['error']:
+            yield prefix + connector + f"{child['name']}  [{child['error']}]"
+            continue
+        yield prefix + connector + f"{child['name']}  [{human_size(child['bytes'])}, {child['files']:,} files]"
         if max_depth is None or current_depth < max_depth:
-            tree(
-                os.path.join(path, folder),
-                prefix + extension,
-                max_files=max_files,
-                _is_root=False,
-                show_hidden=show_hidden,
-                max_depth=max_depth,
-                current_depth=current_depth + 1
-            )
-
-    # Print first N files
-    for idx, file in enumerate(files[:max_files]):
-        is_last = (idx == len(files[:max_files]) - 1)
-        connector = "└── " if is_last else "├── "
-        print(prefix + connector + file)
+            yield from iter_du_lines(child, prefix + ("    " if is_last else "│   "), max_depth, current_depth + 1)
+    if own_files:
+        yield prefix + f"└── ({own_files:,} files, {human_size(node['own']['bytes'])})"
+
+
+def du_summary(node, top_k=DU_TOP_K, top_exts=DU_TOP_EXTS):
+    """
+    (largest files as (size, relative path), extensions as (ext, count, bytes)) over the whole tree.
+    """
+    top = []
+    exts = {}
+    stack = [(node, "")]
+    while stack:
+        current, rel = stack.pop()
+        own = current['own']
+        if own is None:
+            continue
+        for size, name in own['top']:
+            item = (size, f"{rel}/{name}" if rel else name)
+            if len(top) < top_k:
+                heapq.heappush(top, item)
+            else:
+                heapq.heappushpop(top, item)
+        for ext, (count, total) in own['exts'].items():
+            c, t = exts.get(ext, (0, 0))
+            exts[ext] = (c + count, t + total)
+        for child in current['children']:
+            stack.append((child, f"{rel}/{child['name']}" if rel else child['name']))
+    largest = sorted(top, reverse=True)
+    by_ext = sorted(((ext, c, t) for ext, (c, t) in exts.items()), key=lambda e: -e[2])[:top_exts]
+    return largest, by_ext
+
+
+def du(path, max_depth=None, top_k=DU_TOP_K, use_cache=True, refresh=False):
+    """
+    Print per-directory totals, the largest files and a per-extension histogram for path.
+    """
+    path = os.path.abspath(path)
+    cache = DuCache() if use_cache else None
+    stats = {'scanned': 0, 'cached': 0}
+    try:
+        node = disk_usage(path, cache, top_k, refresh, stats)
+    finally:
+        if cache is not None:
+            cache.close()
+    if node['error']:
+        print(f"{path}  [{node['error']}]")
+        return
+    print(f"{path}  [{human_size(node['bytes'])}, {node['files']:,} files]")
+    for line in iter_du_lines(node, max_depth=max_depth):
+        print(line)
+
+    largest, by_ext = du_summary(node, top_k)
+    if largest:
+        print("\nLargest files:")
+        for size, rel in largest:
+            print(f"{human_size(size):>11}  {rel}")
+    if by_ext:
+        print("\nBy extension:")
+        width = max(len(ext) for ext, _, _ in by_ext)
+        for ext, count, total in by_ext:
+            share = total / node['bytes'] if node['bytes'] else 0
+            print(f"{ext:<{width}}  {count:>10,} files {human_size(total):>11}  {'#' * round(share * 40)}")
+    print(f"\n{stats['scanned']:,} directories scanned, {stats['cached']:,} from cache.")
 
-    extra = len(files) - max_files
-    if extra > 0:
-        print(prefix + f"┊ ... ({extra} more files)")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -53,11 +328,29 @@ if __name__ == "__main__":
     parser.add_argument('-a', '--all', action='store_true', help='All files are listed')
     parser.add_argument('-L', '--max-depth', type=int, help='Max display depth of the directory tree')
     parser.add_argument('-n', '--num-files', type=int, default=2, help='Max files per directory to display (default: 2)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='List sibling directories concurrently with this many threads (for network mounts)')
+    parser.add_argument('--du', action='store_true',
+                        help='Show directory sizes and file counts, the largest files and an extension histogram')
+    parser.add_argument('--top', type=int, default=DU_TOP_K, help=f'With --du: largest files to list (default: {DU_TOP_K})')
+    parser.add_argument('--refresh', action='store_true', help='With --du: rescan every directory, ignoring the cache')
+    parser.add_argument('--no-cache', action='store_true', help='With --du: neither read nor write the cache')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='Stream one JSON record per entry (path, depth, type, size, mtime); lists every file')
     args = parser.parse_args()
 
+    if args.ndjson:
+        write_ndjson(iter_records(args.path, show_hidden=args.all, max_depth=args.max_depth))
+        raise SystemExit
+
+    if args.du:
+        du(args.path, max_depth=args.max_depth, top_k=args.top, use_cache=not args.no_cache, refresh=args.refresh)
+        raise SystemExit
+
     tree(
         args.path,
         max_files=args.num_files,
         show_hidden=args.all,
-        max_depth=args.max_depth
+        max_depth=args.max_depth,
+        workers=args.workers
     )
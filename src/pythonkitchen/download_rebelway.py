@@ -3,8 +3,14 @@
 import os
 import re
 import sys
+import argparse
 import html
+import json
 import time
+import queue
+import hashlib
+import sqlite3
+import threading
 import pandas as pd
 import requests
 import browser_cookie3
@@ -16,17 +22,28 @@ from selenium.webdriver.chrome.service  import Service
 from webdriver_manager.chrome          import ChromeDriverManager
 from selenium.common.exceptions import InvalidSessionIdException
 from requests.adapters   import HTTPAdapter
+from concurrent.futures  import ThreadPoolExecutor
 from urllib3.util.retry   import Retry
 from bs4                 import BeautifulSoup
 
 # — CONFIG — 
 EXCEL_PATH   = os.path.expanduser('~/Desktop/course_template.xlsx')
 SHEET_NAME   = 'lessons'
-SKIP_FIRST   = 48     # skip rows 0–18, resume at row 19 (the 20th)
 OUT_DIR      = os.path.expanduser('~/Downloads/RebelwaySource')
+STATE_DB     = os.path.join(OUT_DIR, '.rebelway_state.sqlite')  # per-lesson progress, replaces SKIP_FIRST
+URL_TTL      = 30 * 60  # seconds a source URL is trusted when it carries no exp= of its own
+URL_MARGIN   = 5 * 60   # re-resolve URLs that expire sooner than this
 TIMEOUT_CONN = 10      # seconds for connect
 TIMEOUT_READ = 300     # seconds for read
 RETRY_TOTAL  = 5       # number of retries on failure
+DOWNLOAD_WORKERS = 4   # files downloaded in parallel
+PER_HOST_LIMIT   = 2   # at most this many downloads from one host at a time
+RESUME_ATTEMPTS  = 3   # times a dropped download is resumed within one run
+SEGMENTS         = 1   # >1: fetch each file over this many parallel ranged connections
+CHUNK_SIZE       = 1024*1024        # bytes per read from a response
+MIN_SEGMENT_SIZE = 8 * 1024*1024    # smaller files (or segments) aren't worth splitting
+PAGE_WORKERS     = 8   # lesson pages fetched in parallel by the HTTP resolver
+TIMEOUT_PAGE     = 30  # seconds to read a lesson page
 
 # — HELPERS — 
 def slugify(text: str) -> str:
@@ -44,7 +61,7 @@ def make_chrome_driver():
     svc  = Service(ChromeDriverManager().install())
     return webdriver.Chrome(service=svc, options=opts)
 
-def make_download_session():
+def make_download_session(pool_size: int = DOWNLOAD_WORKERS):
     # piggy-back your Chrome cookies for auth
     cj   = browser_cookie3.chrome()
     sess = requests.Session()
@@ -56,7 +73,8 @@ def make_download_session():
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=["GET"]
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    # one pooled connection per worker, so parallel downloads reuse connections
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
     sess.mount("https://", adapter)
     sess.mount("http://", adapter)
     return sess
@@ -72,40 +90,476 @@ def find_source_url(html_text: str) -> str | None:
             return html.unescape(opt["value"])
     return None
 
-def download_with_stream(sess: requests.Session, url: str, dest: str):
-    # stream with generous read timeout
-    with sess.get(url, stream=True, timeout=(TIMEOUT_CONN, TIMEOUT_READ)) as r:
+def fetch_source_url(sess: requests.Session, lesson: str) -> str | None:
+    """
+    Resolve a lesson over plain HTTP with the Chrome cookies instead of a browser.
+    None when the page can't be fetched or has no SOURCE option, which also covers
+    a logged-out page or a widget that only JS renders; those go to Selenium.
+    """
+    try:
+        r = sess.get(lesson, timeout=(TIMEOUT_CONN, TIMEOUT_PAGE))
         r.raise_for_status()
-        os.makedirs(os.path.dirname(dest), exist_ok=True)
-        with open(dest, "wb") as f:
-            for chunk in r.iter_content(1024*1024):
-                if chunk:
-                    f.write(chunk)
+    except requests.RequestException as e:
+        print(f"⚠ Fetching {lesson} failed ({type(e).__name__}), falling back to Chrome")
+        return None
+    return find_source_url(r.text)
+
+def _validator(r: requests.Response) -> str | None:
+    # If-Range needs a strong ETag; fall back to Last-Modified
+    etag = r.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return r.headers.get("Last-Modified")
+
+def _total_size(r: requests.Response) -> int | None:
+    # full size from Content-Range on a 206, Content-Length on a 200
+    if r.status_code == 206:
+        total = r.headers.get("Content-Range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = r.headers.get("Content-Length")
+    if length is None or r.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    return int(length)
+
+def _discard(*paths):
+    for p in paths:
+        if os.path.exists(p):
+            os.remove(p)
+
+def remote_size(sess: requests.Session, url: str, referer: str | None = None) -> int | None:
+    try:
+        headers = {"Referer": referer} if referer else {}
+        r = sess.head(url, headers=headers, allow_redirects=True, timeout=(TIMEOUT_CONN, TIMEOUT_CONN))
+        if r.ok and "Content-Length" in r.headers:
+            return int(r.headers["Content-Length"])
+    except requests.RequestException:
+        pass
+    return None
+
+def _download_single(sess: requests.Session, url: str, part: str, meta_path: str, headers: dict,
+                     chunk_size: int = CHUNK_SIZE):
+    """
+    One connection, appending to part. An existing .part is resumed with a Range
+    request guarded by If-Range, using the ETag (or Last-Modified) saved with it;
+    if the file changed on the server, the download starts over. Returns the SHA256
+    of the file, computed while streaming (a resumed prefix is read once to seed it).
+    """
+    name = os.path.basename(part)
+    h, hashed = None, 0
+    for attempt in range(RESUME_ATTEMPTS + 1):
+        meta = _load_meta(meta_path)
+        if "segments" in meta:
+            # left behind by a segmented run: preallocated, so its size says nothing
+            _discard(part, meta_path)
+            meta = {}
+        have = os.path.getsize(part) if os.path.exists(part) else 0
+
+        req_headers = dict(headers)
+        if have and meta.get("validator"):
+            req_headers["Range"] = f"bytes={have}-"
+            req_headers["If-Range"] = meta["validator"]
+            print(f"↻ Resuming {name} at {have / 1e6:.1f} MB")
+
+        try:
+            # stream with generous read timeout
+            with sess.get(url, stream=True, headers=req_headers, timeout=(TIMEOUT_CONN, TIMEOUT_READ)) as r:
+                if r.status_code == 416 and have and meta.get("total") == have:
+                    return file_sha256(part)  # the .part was already complete
+                if r.status_code == 416:
+                    _discard(part, meta_path)
+                    continue
+                r.raise_for_status()
+                total = _total_size(r)
+                if r.status_code == 206:
+                    start = r.headers.get("Content-Range", "").split(" ")[-1].split("-")[0]
+                    if start != str(have) or (meta.get("total") not in (None, total)):
+                        print(f"⚠ Server can't resume {name} where it stopped, starting over")
+                        _discard(part, meta_path)
+                        continue
+                    mode = "ab"
+                    if h is None or hashed != have:
+                        h, hashed = hashlib.sha256(), have
+                        with open(part, "rb") as f:
+                            while block := f.read(chunk_size):
+                                h.update(block)
+                else:
+                    # full response: no resume support, or the file changed since the .part began
+                    mode = "wb"
+                    h, hashed = hashlib.sha256(), 0
+                    _save_meta(meta_path, {"validator": _validator(r), "total": total})
+                with open(part, mode) as f:
+                    for chunk in r.iter_content(chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            h.update(chunk)
+                            hashed += len(chunk)
+            return h.hexdigest()
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == RESUME_ATTEMPTS:
+                raise
+            print(f"⚠ {name} interrupted ({e.__class__.__name__}), resuming…")
+
+def _preallocate(fd: int, size: int):
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:  # filesystem without fallocate support
+            pass
+    os.ftruncate(fd, size)
+
+def _write_at(fd: int, data: bytes, offset: int):
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            n = os.pwrite(fd, view, offset)
+        else:  # Windows: every segment has its own fd, so seek + write is safe
+            os.lseek(fd, offset, os.SEEK_SET)
+            n = os.write(fd, view)
+        view = view[n:]
+        offset += n
+
+def _plan_segments(total: int, segments: int, have: int = 0) -> list[list[int]]:
+    # [start, end (exclusive), bytes done]; a resumed single-stream prefix counts as one done segment
+    plan = [[0, have, have]] if have else []
+    size = max((total - have + segments - 1) // segments, MIN_SEGMENT_SIZE)
+    for start in range(have, total, size):
+        plan.append([start, min(start + size, total), 0])
+    return plan
+
+def _download_segmented(sess: requests.Session, url: str, part: str, meta_path: str, headers: dict,
+                        total: int, validator: str, segments: int, chunk_size: int = CHUNK_SIZE):
+    """
+    Fetch [0, total) as `segments` byte ranges on parallel connections, each written at its
+    own offset into the preallocated part. Progress per segment is kept in the .part.json,
+    so an interrupted run resumes every segment where it stopped.
+    """
+    name = os.path.basename(part)
+    meta = _load_meta(meta_path)
+    if meta.get("validator") == validator and meta.get("total") == total and "segments" in meta:
+        plan = meta["segments"]
+        print(f"↻ Resuming {name}: {sum(s[2] for s in plan) / 1e6:.1f} of {total / 1e6:.1f} MB")
+    else:
+        # a single-stream .part of the same file keeps its prefix
+        have = os.path.getsize(part) if os.path.exists(part) and meta.get("validator") == validator \
+            and meta.get("total") == total else 0
+        plan = _plan_segments(total, segments, have)
+        if not have:
+            _discard(part)
+        with open(part, "ab") as f:
+            _preallocate(f.fileno(), total)
+    meta = {"validator": validator, "total": total, "segments": plan}
+    lock = threading.Lock()
+    _save_meta(meta_path, meta)
+
+    def fetch(seg):
+        fd = os.open(part, os.O_RDWR | getattr(os, "O_BINARY", 0))
+        try:
+            for attempt in range(RESUME_ATTEMPTS + 1):
+                start, end, done = seg
+                if start + done >= end:
+                    return
+                req_headers = dict(headers, Range=f"bytes={start + done}-{end - 1}", **{"If-Range": validator})
+                try:
+                    with sess.get(url, stream=True, headers=req_headers, timeout=(TIMEOUT_CONN, TIMEOUT_READ)) as r:
+                        r.raise_for_status()
+                        if r.status_code != 206:
+                            raise IOError(f"{name} changed on the server while downloading")
+                        for chunk in r.iter_content(chunk_size):
+                            if not chunk:
+                                continue
+                            chunk = chunk[:end - start - seg[2]]
+                            _write_at(fd, chunk, start + seg[2])
+                            seg[2] += len(chunk)
+                    if seg[2] < end - start:
+                        raise requests.exceptions.ChunkedEncodingError("segment ended early")
+                    return
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                    if attempt == RESUME_ATTEMPTS:
+                        raise
+        finally:
+            os.close(fd)
+            with lock:
+                _save_meta(meta_path, meta)
+
+    todo = [seg for seg in plan if seg[2] < seg[1] - seg[0]]
+    with ThreadPoolExecutor(max_workers=max(len(todo), 1)) as ex:
+        for future in [ex.submit(fetch, seg) for seg in todo]:
+            future.result()
+    missing = sum(seg[1] - seg[0] - seg[2] for seg in plan)
+    if missing:
+        raise IOError(f"{name}: {missing} bytes missing after segmented download")
+
+def _load_meta(meta_path: str) -> dict:
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_meta(meta_path: str, meta: dict):
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+def _probe(sess: requests.Session, url: str, headers: dict):
+    """
+    (final url after redirects, total size, validator) when the server takes byte ranges, else None.
+    """
+    try:
+        r = sess.head(url, headers=headers, allow_redirects=True, timeout=(TIMEOUT_CONN, TIMEOUT_CONN))
+    except requests.RequestException:
+        return None
+    if not r.ok or r.headers.get("Accept-Ranges", "").lower() != "bytes" or not _validator(r):
+        return None
+    total = _total_size(r)
+    return (r.url, total, _validator(r)) if total else None
+
+def download_with_stream(sess: requests.Session, url: str, dest: str, referer: str | None = None,
+                         segments: int = SEGMENTS, chunk_size: int = CHUNK_SIZE):
+    """
+    Download url into dest + ".part" and rename it to dest only once the size checks
+    out, so dest existing means the file is complete. Interrupted downloads resume
+    from the .part (up to RESUME_ATTEMPTS times per run, and again on the next run).
+
+    With segments > 1 and a server that advertises Accept-Ranges, the file is split
+    into that many byte ranges fetched on parallel connections (see _download_segmented);
+    otherwise it streams over one connection. Returns the file's SHA256 when it was
+    hashed on the way in (single stream), else None.
+    """
+    part = dest + ".part"
+    meta_path = part + ".json"
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+    # Referer per request (Vimeo progressive-redirect), since workers share the session;
+    # identity encoding so byte offsets are file offsets
+    headers = {"Accept-Encoding": "identity"}
+    if referer:
+        headers["Referer"] = referer
+
+    probe = _probe(sess, url, headers) if segments > 1 else None
+    if probe and probe[1] >= 2 * MIN_SEGMENT_SIZE:
+        final_url, total, validator = probe
+        _download_segmented(sess, final_url, part, meta_path, headers, total, validator, segments, chunk_size)
+        digest = None
+    else:
+        digest = _download_single(sess, url, part, meta_path, headers, chunk_size)
+
+    size = os.path.getsize(part)
+    total = _load_meta(meta_path).get("total")
+    if total is not None and size != total:
+        raise IOError(f"Incomplete download: {size} of {total} bytes (kept {part} for resume)")
+    os.replace(part, dest)
+    _discard(meta_path)
+    return digest
+
+def url_expiry(src_url: str, resolved_at: float | None = None) -> float:
+    # signed CDN URLs carry their expiry as exp=<epoch seconds>
+    m = re.search(r'(?:^|[?&~/])exp=(\d{9,})', src_url)
+    if m:
+        return float(m.group(1))
+    return (resolved_at or time.time()) + URL_TTL
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+class LessonStore:
+    """
+    SQLite record of every lesson keyed by its link: where it is in the pipeline
+    (resolved, no_source, downloading, done, failed), the resolved source URL and
+    when it expires, the target filename, bytes done, checksum and last error.
+    Shared by the resolver loop and the download workers.
+    """
+    COLUMNS = ("row", "season", "episode", "filename", "src_url", "url_expires", "status",
+               "bytes_done", "total", "sha256", "error")
+
+    def __init__(self, path: str = STATE_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS lessons (link TEXT PRIMARY KEY, row INTEGER, season INTEGER, "
+            "episode INTEGER, filename TEXT, src_url TEXT, url_expires REAL, status TEXT, "
+            "bytes_done INTEGER, total INTEGER, sha256 TEXT, error TEXT, updated REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, link: str) -> dict:
+        with self._lock:
+            row = self.db.execute("SELECT * FROM lessons WHERE link = ?", (link,)).fetchone()
+        return dict(row) if row else {}
+
+    def update(self, link: str, **fields):
+        fields["updated"] = time.time()
+        names = ", ".join(fields)
+        marks = ", ".join("?" for _ in fields)
+        sets  = ", ".join(f"{k} = excluded.{k}" for k in fields)
+        with self._lock:
+            self.db.execute(f"INSERT INTO lessons (link, {names}) VALUES (?, {marks}) "
+                            f"ON CONFLICT(link) DO UPDATE SET {sets}", (link, *fields.values()))
+            self.db.commit()
+
+    def rows(self) -> list[dict]:
+        with self._lock:
+            return [dict(r) for r in self.db.execute("SELECT * FROM lessons ORDER BY row")]
+
+    def close(self):
+        self.db.close()
+
+def print_status(store: LessonStore):
+    rows = store.rows()
+    if not rows:
+        print("No lessons recorded yet.")
+        return
+    counts = {}
+    for r in rows:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    print("  ".join(f"{status}: {n}" for status, n in sorted(counts.items())))
+    done_bytes = sum(r["bytes_done"] or 0 for r in rows if r["status"] == "done")
+    print(f"{done_bytes / 1e9:.2f} GB downloaded")
+    for r in rows:
+        if r["status"] in ("done", "resolved"):
+            continue
+        label = r["filename"] or r["link"]
+        if r["status"] == "failed":
+            print(f"  ✖ [{r['row']}] {label}: {r['error']} ({(r['bytes_done'] or 0) / 1e6:.1f} MB kept)")
+        elif r["status"] == "no_source":
+            print(f"  ∅ [{r['row']}] {label}: no SOURCE option")
+        else:
+            print(f"  … [{r['row']}] {label}: {r['status']}")
+
+class DownloadPool:
+    """
+    Consumer side of the pipeline: `workers` threads share one pooled session and
+    download the (dest, src_url, referer) jobs the page-resolution loop submits.
+    The queue is bounded so resolution doesn't run far ahead of the downloads (the
+    signed source URLs expire), and each host gets at most `per_host` downloads at once.
+    """
+    def __init__(self, sess: requests.Session, workers: int = DOWNLOAD_WORKERS, per_host: int = PER_HOST_LIMIT,
+                 segments: int = SEGMENTS, chunk_size: int = CHUNK_SIZE, store: LessonStore | None = None):
+        self.sess     = sess
+        self.store    = store
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self.jobs     = queue.Queue(maxsize=workers * 2)
+        self.per_host = per_host
+        self.saved    = []
+        self.failed   = []
+        self._hosts   = {}
+        self._lock    = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            return self._hosts.setdefault(host, threading.BoundedSemaphore(self.per_host))
+
+    def submit(self, dest: str, src_url: str, referer: str):
+        # blocks while the queue is full
+        self.jobs.put((dest, src_url, referer))
+
+    def _work(self):
+        while (job := self.jobs.get()) is not None:
+            dest, src_url, referer = job
+            fname = os.path.basename(dest)
+            try:
+                with self._host_slot(src_url):
+                    print(f"↓ Downloading → {fname}")
+                    digest = download_with_stream(self.sess, src_url, dest, referer=referer,
+                                                  segments=self.segments, chunk_size=self.chunk_size)
+                print(f"✔  Saved: {dest}")
+                with self._lock:
+                    self.saved.append(dest)
+                if self.store:
+                    size = os.path.getsize(dest)
+                    # segments arrive out of order, so those files are hashed here, after the host slot is free
+                    self.store.update(referer, status="done", bytes_done=size, total=size,
+                                      sha256=digest or file_sha256(dest), error=None)
+            except Exception as e:
+                print(f"Failed: {fname}: {e}")
+                with self._lock:
+                    self.failed.append((dest, str(e)))
+                if self.store:
+                    part = dest + ".part"
+                    fields = {"status": "failed", "error": str(e),
+                              "bytes_done": os.path.getsize(part) if os.path.exists(part) else 0}
+                    # a refused source URL has probably expired: resolve it again next time
+                    response = getattr(e, "response", None)
+                    if response is not None and response.status_code in (401, 403, 410):
+                        fields["src_url"] = None
+                    self.store.update(referer, **fields)
+
+    def close(self):
+        """
+        Wait for every submitted download to finish.
+        """
+        for _ in self._threads:
+            self.jobs.put(None)
+        for t in self._threads:
+            t.join()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Download the SOURCE video of every Rebelway lesson in the sheet.")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="files downloaded in parallel")
+    parser.add_argument("--segments", type=int, default=SEGMENTS,
+                        help="parallel ranged connections per file (1 = single stream)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes per read from a response")
+    parser.add_argument("--resolver", choices=("http", "selenium"), default="http",
+                        help="http: fetch lesson pages with the Chrome cookies, using Chrome only for pages "
+                             "without a SOURCE option; selenium: load every page in Chrome")
+    parser.add_argument("--page-workers", type=int, default=PAGE_WORKERS,
+                        help="lesson pages fetched in parallel by the http resolver")
+    parser.add_argument("--retry-failed", action="store_true", help="only retry lessons whose download failed")
+    parser.add_argument("--status", action="store_true", help="print the progress recorded in the state store and exit")
+    parser.add_argument("--state", default=STATE_DB, help="state store path")
+    return parser.parse_args(argv)
+
+def resolve_with_selenium(driver, lesson: str):
+    """
+    (driver, source url or None); the driver is replaced if its session died.
+    """
+    # Safely load the lesson page (restart Chrome if needed)
+    try:
+        driver.get(lesson)
+    except InvalidSessionIdException:
+        print("🔄 Chrome session died, restarting…")
+        driver.quit()
+        driver = make_chrome_driver()
+        driver.get(lesson)
+    driver.implicitly_wait(3)  # let JS inject the widget
+    return driver, find_source_url(driver.page_source)
 
 def main():
+    args = parse_args()
+    os.makedirs(OUT_DIR, exist_ok=True)
+    store = LessonStore(args.state)
+    if args.status:
+        print_status(store)
+        store.close()
+        return
+
     # load the full lessons sheet
     df = pd.read_excel(EXCEL_PATH, sheet_name=SHEET_NAME, engine="openpyxl")
     if not {"chapter_index","name","link"}.issubset(df.columns):
         print("🚨 Missing one of required columns (chapter_index,name,link).", file=sys.stderr)
         sys.exit(1)
 
-    driver  = make_chrome_driver()
-    sess_dl = make_download_session()
-
-    os.makedirs(OUT_DIR, exist_ok=True)
+    driver  = None  # Chrome only starts once a lesson actually needs resolving
+    sess_dl = make_download_session(pool_size=args.workers * max(args.segments, 1))
+    pool    = DownloadPool(sess_dl, workers=args.workers, segments=args.segments, chunk_size=args.chunk_size,
+                           store=store)
 
-    # seed episode counters by counting the first SKIP_FIRST rows
+    # 1) Work out what needs doing; finished lessons are skipped without touching the page
+    todo = []
     ep_counters = {}
-    for pre in df.iloc[:SKIP_FIRST].itertuples():
-        chap = int(pre.chapter_index)
-        ep_counters[chap] = ep_counters.get(chap, 0) + 1
-
     for idx, row in df.iterrows():
-        # skip the already-downloaded lessons
-        if idx < SKIP_FIRST:
-            continue
-
-
         chap   = int(row["chapter_index"])
         title  = str(row["name"])
         lesson = row["link"]
@@ -116,45 +570,106 @@ def main():
         season  = chap
         episode = ep_counters[chap]
 
-        slug = slugify(title)
+        state = store.get(lesson)
+        if state.get("status") == "done" and state.get("filename") \
+                and os.path.exists(os.path.join(OUT_DIR, state["filename"])):
+            continue
+        if args.retry_failed and state.get("status") != "failed":
+            continue
 
-        print(f"\n➡️  [{idx+1}] Loading {lesson} (s{season:02d}e{episode:02d})")
-        # Safely load the lesson page (restart Chrome if needed)
-        try:
-            driver.get(lesson)
-        except InvalidSessionIdException:
-            print("🔄 Chrome session died, restarting…")
-            driver.quit()
-            driver = make_chrome_driver()
-            driver.get(lesson)
-        driver.implicitly_wait(3)  # let JS inject the widget
-        html_body = driver.page_source
-        src_url   = find_source_url(html_body)
+        src_url = state.get("src_url")
+        if not (src_url and (state.get("url_expires") or 0) - time.time() > URL_MARGIN):
+            src_url = None
+        todo.append((idx, lesson, season, episode, slugify(title), src_url))
+
+    # 2) Fetch the pages still to resolve in parallel, in sheet order, but only a window
+    #    ahead of the loop: signed source URLs start expiring as soon as a page is read
+    pages   = {}
+    fetcher = None
+    sess_pages = None
+    fetched = 0
+    window  = args.workers * 2 + args.page_workers
+    if args.resolver == "http":
+        sess_pages = make_download_session(pool_size=args.page_workers)
+        fetcher    = ThreadPoolExecutor(max_workers=args.page_workers)
+
+    def fetch(lesson):
+        return fetch_source_url(sess_pages, lesson), time.time()
+
+    def resolve(lesson):
+        # (source url or None, when it was read); Chrome runs the page's JS when the plain HTML has no SOURCE
+        nonlocal driver
+        if lesson in pages:
+            src_url, resolved_at = pages.pop(lesson).result()
+        elif fetcher:
+            src_url, resolved_at = fetch(lesson)
+        else:
+            src_url, resolved_at = None, None
         if not src_url:
-            print(f"No SOURCE option found for s{season:02d}e{episode:02d}.")
-            continue
+            driver = driver or make_chrome_driver()
+            driver, src_url = resolve_with_selenium(driver, lesson)
+            resolved_at = time.time()
+        return src_url, resolved_at
+
+    for pos, (idx, lesson, season, episode, slug, src_url) in enumerate(todo):
+        if fetcher:
+            while fetched < min(pos + window, len(todo)):
+                if not todo[fetched][5]:
+                    pages[todo[fetched][1]] = fetcher.submit(fetch, todo[fetched][1])
+                fetched += 1
+
+        if src_url:
+            print(f"\n➡️  [{idx+1}] Reusing resolved source for s{season:02d}e{episode:02d}")
+            expires = store.get(lesson).get("url_expires") or 0
+        else:
+            print(f"\n➡️  [{idx+1}] Resolving {lesson} (s{season:02d}e{episode:02d})")
+            src_url, resolved_at = resolve(lesson)
+            if not src_url:
+                print(f"No SOURCE option found for s{season:02d}e{episode:02d}.")
+                store.update(lesson, row=idx+2, season=season, episode=episode, status="no_source", src_url=None)
+                continue
+            expires = url_expiry(src_url, resolved_at)
+            store.update(lesson, src_url=src_url, url_expires=expires, status="resolved")
 
         ext = os.path.splitext(urlsplit(src_url).path)[1] or ".mp4"
 
         fname = f"s{season:02d}e{episode:02d}_{slug}{ext}"
         dest  = os.path.join(OUT_DIR, fname)
-        # 1) Skip if we already have it
+        store.update(lesson, row=idx+2, season=season, episode=episode, filename=fname)
+        # 3) Skip if we already have it. Downloads land via rename, so dest is complete;
+        #    files cut short by older runs are caught by comparing with the server's size
         if os.path.exists(dest):
-            print(f"⏭ Skipping already downloaded: {fname}")
-            continue
+            expected = remote_size(sess_dl, src_url, referer=lesson)
+            if expected in (None, os.path.getsize(dest)):
+                print(f"⏭ Skipping already downloaded: {fname}")
+                size = os.path.getsize(dest)
+                store.update(lesson, status="done", bytes_done=size, total=size, error=None)
+                continue
+            print(f"⚠ {fname} is incomplete ({os.path.getsize(dest)} of {expected} bytes), downloading again")
 
-        # 2) Include Referer header for downloads (Vimeo progressive-redirect)
-        sess_dl.headers["Referer"] = lesson
-
-        print(f"↓ Downloading → {fname}")
-        try:
-            download_with_stream(sess_dl, src_url, dest)
-            print(f"✔  Saved: {dest}")
-        except Exception as e:
-            print(f"Failed: {e}")
+        # 4) Hand it to the download workers (with the lesson as Referer) and move on; a URL
+        #    that went stale while earlier lessons were queued is read off the page again
+        if expires - time.time() <= URL_MARGIN:
+            print(f"🔄 Source URL for {fname} is about to expire, resolving again")
+            src_url, resolved_at = resolve(lesson)
+            if not src_url:
+                print(f"No SOURCE option found for s{season:02d}e{episode:02d}.")
+                store.update(lesson, status="no_source", src_url=None)
+                continue
+            store.update(lesson, src_url=src_url, url_expires=url_expiry(src_url, resolved_at))
+        store.update(lesson, status="downloading")
+        pool.submit(dest, src_url, lesson)
 
-    driver.quit()
-    print("\n🎉 All done.")
+    if fetcher:
+        fetcher.shutdown()
+    if driver:
+        driver.quit()
+    print("\n⏳ All lessons resolved, waiting for downloads…")
+    pool.close()
+    print(f"\n🎉 All done. {len(pool.saved)} saved, {len(pool.failed)} failed.")
+    for dest, err in pool.failed:
+        print(f"  ✖ {os.path.basename(dest)}: {err}")
+    store.close()
 
 if __name__ == "__main__":
     main()
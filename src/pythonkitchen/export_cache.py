@@ -0,0 +1,172 @@
+# src/pythonkitchen/export_cache.py
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+# one small JSON file per output file; bump CACHE_VERSION whenever the record format changes
+CACHE_DIR = Path.home() / ".pythonkitchen" / "export_cache"
+CACHE_VERSION = 1
+
+
+def fingerprint(path: str, limit) -> list:
+    """
+    What a rendered block depends on: the file's size and mtime_ns, and the excerpt limit.
+    """
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, limit]
+
+
+class ExportCache:
+    """
+    What the last export to one output file consisted of: a list of sections (the tree
+    and the text between blocks, then one per dumped file) with their length and hash,
+    and for file sections the fingerprint the block was rendered from. No file contents
+    are kept here: an unchanged file's block is read back from the previous output,
+    which is trusted only while it still has the size and mtime recorded.
+    """
+    def __init__(self, output_path, cache_dir: Path = CACHE_DIR):
+        self.output = Path(output_path).resolve()
+        key = hashlib.sha1(str(self.output).encode()).hexdigest()[:16]
+        self.path = Path(cache_dir) / f"{key}.json"
+        self.sections = []  # [rel or None, fingerprint or None, length, sha1]
+        self.hits = 0
+        self._blocks = {}   # rel -> (fingerprint, offset, length)
+        self._fp = None
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            st = os.stat(self.output)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != CACHE_VERSION or data.get('output') != [st.st_size, st.st_mtime_ns]:
+            return
+        self.sections = data.get('sections', [])
+        offset = 0
+        for rel, key, length, _ in self.sections:
+            if key is not None:
+                self._blocks[rel] = (key, offset, length)
+            offset += length
+        self._fp = open(self.output, 'rb')
+
+    def lookup(self, rel: str, path: str, limit):
+        """
+        (block text or None, fingerprint); the text is read from the previous output.
+        """
+        key = fingerprint(path, limit)
+        found = self._blocks.get(rel)
+        if found is None or found[0] != key:
+            return None, key
+        _, offset, length = found
+        with self._lock:
+            self._fp.seek(offset)
+            data = self._fp.read(length)
+            if len(data) != length:
+                return None, key
+            self.hits += 1
+        return data.decode('utf-8'), key
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def save(self, sections: list) -> None:
+        """
+        Record the sections just written to the output file, readable only by the owner.
+        """
+        self.close()
+        st = os.stat(self.output)
+        self.path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(tmp, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'output': [st.st_size, st.st_mtime_ns], 'sections': sections}, f,
+                      separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+
+class PatchWriter:
+    """
+    Writes an export section by section. File sections are given with write_section;
+    any other text goes through write and becomes a section of its own.
+
+    With the previous export's sections (in_place), the output file is updated where it
+    is: while sections line up with the previous ones (same file, same length), only
+    those whose hash changed are written. From the first section that doesn't line up,
+    everything after is rewritten, collected aside first so that blocks still being
+    read back from the old file stay intact. Without in_place the export goes to a
+    temporary file that replaces the output on close.
+    """
+    def __init__(self, path, previous: list | None = None, in_place: bool = True):
+        self.path = Path(path)
+        self.sections = []
+        self.rewritten = 0
+        self._in_place = in_place
+        self._old = (previous or []) if in_place else []
+        self._offset = 0
+        self._pending = []
+        self._tail = None
+        self._tail_start = 0
+        if in_place:
+            self._fp = open(self.path, 'r+b' if self.path.exists() else 'wb')
+        else:
+            self._tmp = self.path.with_name(self.path.name + '.tmp')
+            self._fp = open(self._tmp, 'wb')
+
+    def _emit(self, rel, key, data: bytes) -> None:
+        digest = hashlib.sha1(data).hexdigest()
+        if self._old and self._tail is None:
+            i = len(self.sections)
+            old = self._old[i] if i < len(self._old) else None
+            if old is not None and old[0] == rel and old[2] == len(data):
+                if old[3] != digest:
+                    self._fp.seek(self._offset)
+                    self._fp.write(data)
+                    self.rewritten += 1
+            else:
+                self._tail = tempfile.TemporaryFile(dir=self.path.parent)
+                self._tail_start = self._offset
+        if self._tail is not None or not self._old:
+            (self._tail or self._fp).write(data)
+            self.rewritten += 1
+        self.sections.append([rel, key, len(data), digest])
+        self._offset += len(data)
+
+    def _flush_pending(self) -> None:
+        if self._pending:
+            self._emit(None, None, ''.join(self._pending).encode('utf-8'))
+            self._pending.clear()
+
+    def write(self, text: str) -> None:
+        self._pending.append(text)
+
+    def writelines(self, pieces) -> None:
+        for piece in pieces:
+            self.write(piece)
+
+    def write_section(self, rel: str, key, text: str) -> None:
+        self._flush_pending()
+        self._emit(rel, key, text.encode('utf-8'))
+
+    def close(self) -> list:
+        """
+        Finish the file and return its sections, to keep for the next export.
+        """
+        self._flush_pending()
+        if self._tail is not None:
+            self._tail.seek(0)
+            self._fp.seek(self._tail_start)
+            shutil.copyfileobj(self._tail, self._fp)
+            self._tail.close()
+        self._fp.truncate(self._offset)
+        self._fp.close()
+        if not self._in_place:
+            os.replace(self._tmp, self.path)
+        return self.sections
@@ -0,0 +1,160 @@
+# src/pythonkitchen/ignore_rules.py
+
+import os
+import re
+
+# ignore files read in every directory; later files win over earlier ones (.ignore over .gitignore)
+IGNORE_FILES = ('.gitignore', '.ignore')
+
+
+def _translate(pattern: str) -> str:
+    """
+    Regex body for one gitignore glob, matched against a '/'-separated path
+    relative to the ignore file's directory.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                at_start = i == 0 or pattern[i - 1] == '/'
+                at_end = i + 2 == n
+                if at_start and at_end:
+                    out.append('.*')
+                    i += 2
+                    continue
+                if at_start and pattern.startswith('**/', i):
+                    out.append('(?:.*/)?')
+                    i += 3
+                    continue
+            out.append('[^/]*')
+            while i < n and pattern[i] == '*':
+                i += 1
+            continue
+        if c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', '^', ']') else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace('\\', '\\\\')
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def parse_rules(lines) -> list[tuple[str, bool, bool]]:
+    """
+    (regex, negated, dir_only) for each pattern line of a gitignore file.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # a slash anywhere but the end anchors the pattern to the ignore file's directory
+        anchored = '/' in line
+        body = _translate(line.lstrip('/'))
+        if not anchored:
+            body = '(?:.*/)?' + body
+        # a matching directory also covers everything below it
+        rules.append((body + '(?:/.*)?', negated, dir_only))
+    return rules
+
+
+class IgnoreMatcher:
+    """
+    The rules of one directory's ignore files, compiled into one alternation per
+    entry kind. Alternatives are ordered last rule first, so the group that matches
+    is the rule git would apply and one regex match answers each lookup.
+    """
+    def __init__(self, rules: list[tuple[str, bool, bool]]):
+        self._negated = {}
+        self._regex = {}
+        for is_dir in (False, True):
+            parts = []
+            for idx in range(len(rules) - 1, -1, -1):
+                body, negated, dir_only = rules[idx]
+                if dir_only and not is_dir:
+                    continue
+                parts.append(f'(?P<r{idx}>{body})')
+                self._negated[f'r{idx}'] = negated
+            self._regex[is_dir] = re.compile('|'.join(parts), re.DOTALL) if parts else None
+
+    def match(self, rel: str, is_dir: bool) -> bool | None:
+        """
+        True if rel is ignored, False if a negated rule re-includes it, None if no rule applies.
+        """
+        regex = self._regex[is_dir]
+        m = regex and regex.fullmatch(rel)
+        if not m:
+            return None
+        return not self._negated[m.lastgroup]
+
+
+def load_matcher(dir_path: str, names=IGNORE_FILES) -> IgnoreMatcher | None:
+    """
+    Matcher for the ignore files directly inside dir_path, or None if it has none.
+    """
+    rules = []
+    for name in names:
+        try:
+            with open(os.path.join(dir_path, name), encoding='utf-8', errors='replace') as f:
+                rules.extend(parse_rules(f))
+        except OSError:
+            continue
+    return IgnoreMatcher(rules) if rules else None
+
+
+class IgnoreStack:
+    """
+    The matchers in effect for one directory during a walk: its own ignore files
+    plus those of every ancestor up to the root. Deeper files override shallower ones.
+    """
+    def __init__(self, levels=()):
+        self.levels = tuple(levels)  # (rel dir of the ignore files, matcher), shallowest first
+
+    @classmethod
+    def for_root(cls, root: str) -> 'IgnoreStack':
+        levels = []
+        exclude = load_matcher(os.path.join(root, '.git', 'info'), ('exclude',))
+        if exclude is not None:
+            levels.append(('', exclude))
+        own = load_matcher(root)
+        if own is not None:
+            levels.append(('', own))
+        return cls(levels)
+
+    def child(self, dir_path: str, rel_dir: str) -> 'IgnoreStack':
+        matcher = load_matcher(dir_path)
+        if matcher is None:
+            return self
+        return IgnoreStack(self.levels + ((rel_dir, matcher),))
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        for base, matcher in reversed(self.levels):
+            result = matcher.match(rel[len(base) + 1:] if base else rel, is_dir)
+            if result is not None:
+                return result
+        return False
@@ -1,6 +1,13 @@
 # pythonkitchen/project_export.py
 import os
+import sys
+import json
+import stat
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from pythonkitchen.ignore_rules import IgnoreStack
+from pythonkitchen.export_cache import ExportCache, PatchWriter
 
 SKIP_EXTS = {'.env'}
 SKIP_NAMES = {'.env'}
@@ -12,138 +19,479 @@ SKIP_CONTENT_NAMES = {'.env', 'README.md'}
 INCLUDE_EXTS = {'.py', '.json', '.yml', '.yaml', '.toml', '.txt', '.md'}
 INCLUDE_NAMES = {'Dockerfile', 'requirements.txt', 'pyproject.toml', '.env'}
 
-def build_tree(root, overrides=None):
+# files over this size, or with a NUL byte in their first SNIFF_BYTES, are left out of the dump
+MAX_DUMP_BYTES = 1024 * 1024
+SNIFF_BYTES = 8192
+
+# token budgeting (--max-tokens): ~4 bytes of source per token, plus the path line and fences
+BYTES_PER_TOKEN = 4
+BLOCK_OVERHEAD_TOKENS = 12
+# a file is cut to a head/tail excerpt only if at least this much budget is left for it
+MIN_EXCERPT_TOKENS = 200
+# kept back from a budget for the tree fence and the closing notes
+NOTE_TOKENS = 24
+
+# ranking for the budget: what describes the project first, lock and generated files last
+PROJECT_NAMES = {'pyproject.toml', 'setup.py', 'setup.cfg', 'requirements.txt', 'Dockerfile', 'README.md'}
+ENTRY_POINT_NAMES = {'__main__.py', 'cli.py', 'main.py', 'app.py', 'manage.py'}
+LOW_RANK_NAMES = {'uv.lock', 'poetry.lock', 'Pipfile.lock', 'package-lock.json', 'yarn.lock',
+                  'pnpm-lock.yaml', 'Cargo.lock'}
+LOW_RANK_SUFFIXES = ('.lock', '.min.js', '.min.css', '_pb2.py', '.generated.py')
+EXT_RANK = {'.py': 50, '.toml': 40, '.yml': 35, '.yaml': 35, '.md': 30, '.json': 20, '.txt': 20}
+
+# files read ahead of the writer when dumping with a thread pool
+READ_AHEAD_PER_WORKER = 4
+
+# one record per entry shown in the tree; `dump` marks files whose content goes into the export
+TreeEntry = namedtuple('TreeEntry', 'name rel path depth is_dir is_last prefix collapsed dump')
+
+LANG_MAP = {
+    ".py": "python", ".json": "json", ".yml": "yaml", ".yaml": "yaml",
+    ".toml": "toml", ".md": "markdown", ".env": "", ".txt": "",
+    "Dockerfile": "docker"
+}
+
+
+def _dump_eligible(fname, overrides, include_env):
+    """
+    Whether a file's content belongs in the dump (by name alone; location is handled by the walker).
+    """
+    if fname in SKIP_CONTENT_NAMES and fname not in overrides:
+        return False
+    ext = Path(fname).suffix.lower()
+
+    # always include overrides
+    if fname in overrides or ext in overrides:
+        include_this = True
+    else:
+        include_this = (
+            ext in INCLUDE_EXTS or
+            fname in INCLUDE_NAMES
+        )
+
+    # env special case
+    if fname == ".env" and not include_env and ".env" not in overrides:
+        include_this = False
+
+    # skip hidden files unless overridden
+    if fname.startswith('.') and fname not in overrides:
+        return False
+    return include_this
+
+
+def walk_project(root, overrides=None, include_env=False, use_ignore=True):
+    """
+    Single os.scandir pass over root, depth-first in sorted order. Yields a TreeEntry for
+    everything the tree shows; the skip/override rules run once per entry and the cached
+    DirEntry type info replaces per-entry isdir() stats. Files under hidden or skipped
+    directories are listed but not marked for the dump.
+
+    With use_ignore, entries matched by .gitignore/.ignore files (and .git/info/exclude)
+    are left out and ignored directories are never entered. Overridden names always stay.
+    """
     overrides = overrides or set()
-    lines = []
-    dir_count = 0
-    file_count = 0
 
-    def walk(dir_path, prefix=""):
-        nonlocal dir_count, file_count
-        entries = sorted(os.listdir(dir_path))
-        # skip names only if they're *not* in overrides
-        # skip tree‐names unless overridden
+    def walk(dir_path, rel_dir, prefix, depth, dumpable, ignores):
+        with os.scandir(dir_path) as it:
+            # skip names only if they're *not* in overrides
+            entries = sorted(
+                (e for e in it
+                 if not (e.name in SKIP_NAMES and e.name not in overrides)),
+                key=lambda e: e.name
+            )
+        if ignores is not None and ignores.levels:
+            entries = [
+                e for e in entries
+                if e.name in overrides
+                or not ignores.ignored(f"{rel_dir}/{e.name}" if rel_dir else e.name, e.is_dir())
+            ]
+        # skip files by extension unless overridden
         entries = [
             e for e in entries
-            if not (e in SKIP_NAMES and (overrides is None or e not in overrides))
+            if e.is_dir() or Path(e.name).suffix.lower() not in SKIP_EXTS
+            or Path(e.name).suffix.lower() in overrides
         ]
         for idx, entry in enumerate(entries):
-            path = os.path.join(dir_path, entry)
             is_last = (idx == len(entries) - 1)
-            connector = "└── " if is_last else "├── "
-            sub_prefix = "    " if is_last else "│   "
-
-            # if directory
-            if os.path.isdir(path):
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_dir():
                 # always show overridden dirs
-                if entry in SKIP_TREE_FILES and entry not in overrides:
-                    lines.append(f"{prefix}{connector}{entry}")
-                    lines.append(f"{prefix}{sub_prefix}// * files hidden for brevity")
-                    dir_count += 1
-                    continue
-                lines.append(f"{prefix}{connector}{entry}")
-                dir_count += 1
-                walk(path, prefix + sub_prefix)
-
-            # if file
+                collapsed = entry.name in SKIP_TREE_FILES and entry.name not in overrides
+                yield TreeEntry(entry.name, rel, entry.path, depth, True, is_last, prefix, collapsed, False)
+                if not collapsed:
+                    hidden = entry.name.startswith('.') and entry.name not in overrides
+                    child = ignores.child(entry.path, rel) if ignores is not None else None
+                    yield from walk(entry.path, rel, prefix + ("    " if is_last else "│   "),
+                                    depth + 1, dumpable and not hidden, child)
             else:
-                ext = Path(entry).suffix.lower()
-                # skip by name or extension unless overridden
-                if (entry in SKIP_NAMES and entry not in overrides) or (ext in SKIP_EXTS and ext not in overrides):
-                    continue
-                lines.append(f"{prefix}{connector}{entry}")
-                file_count += 1
-
-    lines.append(str(root))
-    walk(str(root))
-    lines.append(f"\n{dir_count} directories, {file_count} files\n")
-    return "\n".join(lines)
-
-def dump_code_files(root, include_env=False, overrides=None):
-    overrides = overrides or set()
-    blocks = []
+                dump = dumpable and _dump_eligible(entry.name, overrides, include_env)
+                yield TreeEntry(entry.name, rel, entry.path, depth, False, is_last, prefix, False, dump)
 
-    for dirpath, dirnames, filenames in os.walk(root):
-        # first, drop any files we want to hide in the *content* unless overridden
-        filenames = [
-            f for f in filenames
-            if not (f in SKIP_CONTENT_NAMES and f not in overrides)
-        ]
-        # then, remove skipped folders from traversal
-        dirnames[:] = [
-            d for d in dirnames
-            if not (d in SKIP_TREE_FILES and d not in overrides)
-               and not (d.startswith('.') and d not in overrides)
-        ]
-        for fname in filenames:
-            ext = Path(fname).suffix.lower()
+    ignores = IgnoreStack.for_root(str(root)) if use_ignore else None
+    yield from walk(str(root), "", "", 0, True, ignores)
 
-            # always include overrides
-            if fname in overrides or ext in overrides:
-                include_this = True
-            else:
-                include_this = (
-                    ext in INCLUDE_EXTS or
-                    fname in INCLUDE_NAMES
-                )
 
-            # env special case
-            if fname == ".env" and not include_env and ".env" not in overrides:
-                include_this = False
+def iter_tree_lines(root, entries):
+    """
+    Tree lines one at a time, as the entries arrive from the walker.
+    """
+    yield str(root)
+    dir_count = 0
+    file_count = 0
+    for e in entries:
+        connector = "└── " if e.is_last else "├── "
+        yield f"{e.prefix}{connector}{e.name}"
+        if e.is_dir:
+            dir_count += 1
+            if e.collapsed:
+                sub_prefix = "    " if e.is_last else "│   "
+                yield f"{e.prefix}{sub_prefix}// * files hidden for brevity"
+        else:
+            file_count += 1
+    yield f"\n{dir_count} directories, {file_count} files\n"
+
+
+def render_tree(root, entries):
+    return "\n".join(iter_tree_lines(root, entries))
+
+
+def iter_tree_records(entries):
+    """
+    One JSON-ready record per TreeEntry: path ('/'-separated, relative to the root),
+    depth (1 for top-level entries), type, size in bytes and mtime in epoch seconds.
+    Directories the tree collapses are listed with "collapsed": true.
+    """
+    for e in entries:
+        try:
+            st = os.lstat(e.path)
+        except OSError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            kind = "dir"
+        elif stat.S_ISLNK(st.st_mode):
+            kind = "symlink"
+        elif stat.S_ISREG(st.st_mode):
+            kind = "file"
+        else:
+            kind = "other"
+        record = {"path": e.rel, "depth": e.depth + 1, "type": kind, "size": st.st_size, "mtime": st.st_mtime}
+        if e.collapsed:
+            record["collapsed"] = True
+        yield record
+
+
+def iter_ndjson_tree(root, overrides=None, use_ignore=True):
+    """
+    The project tree as JSON Lines, one line per entry, streamed while the project is walked.
+    """
+    for record in iter_tree_records(walk_project(root, overrides=overrides, use_ignore=use_ignore)):
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def build_tree(root, overrides=None, use_ignore=True):
+    return render_tree(root, walk_project(root, overrides=overrides, use_ignore=use_ignore))
+
+
+def estimate_tokens(text):
+    return (len(text) + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+
+
+def rank_file(entry):
+    """
+    Budget priority of a dump file: project metadata and entry points first, then by
+    type, shallower before deeper, lock and generated files last.
+    """
+    name = entry.name
+    if name in LOW_RANK_NAMES or name.endswith(LOW_RANK_SUFFIXES):
+        return -100
+    if name == 'pyproject.toml':
+        score = 100
+    elif name in ENTRY_POINT_NAMES:
+        score = 90
+    elif name in PROJECT_NAMES:
+        score = 80
+    elif name == '__init__.py':
+        score = 60
+    else:
+        score = EXT_RANK.get(Path(name).suffix.lower(), 10)
+    if any(part in ('tests', 'test') for part in entry.rel.split('/')[:-1]) or name.startswith('test_'):
+        score -= 20
+    return score - 2 * entry.depth
+
+
+def plan_budget(files, max_tokens, max_bytes_per_file=None):
+    """
+    Greedily fill max_tokens with the best-ranked files, estimating each from its size
+    so nothing is read yet. Returns ({rel: byte limit or None for the whole file} for the
+    chosen files, number of files left out). A file that does not fit whole gets an
+    excerpt of what is left when that is at least MIN_EXCERPT_TOKENS.
+    """
+    sized = []
+    for entry in files:
+        try:
+            size = os.stat(entry.path).st_size
+        except OSError:
+            continue
+        if size <= MAX_DUMP_BYTES:
+            sized.append((entry, size))
+    sized.sort(key=lambda item: (-rank_file(item[0]), item[1], item[0].rel))
+
+    limits = {}
+    left = max_tokens
+    omitted = 0
+    for entry, size in sized:
+        limit = max_bytes_per_file if max_bytes_per_file and size > max_bytes_per_file else None
+        cost = (limit or size) // BYTES_PER_TOKEN + BLOCK_OVERHEAD_TOKENS
+        if cost <= left:
+            limits[entry.rel] = limit
+            left -= cost
+        elif left - BLOCK_OVERHEAD_TOKENS >= MIN_EXCERPT_TOKENS:
+            limits[entry.rel] = (left - BLOCK_OVERHEAD_TOKENS) * BYTES_PER_TOKEN
+            left = 0
+        else:
+            omitted += 1
+    return limits, omitted
+
+
+def _excerpt(head: bytes, tail: bytes, omitted: int) -> bytes:
+    # cut on line boundaries so the excerpt does not start or end mid-line
+    if b"\n" in head:
+        head = head[:head.rfind(b"\n") + 1]
+    if b"\n" in tail:
+        tail = tail[tail.find(b"\n") + 1:]
+    return head + f"\n... [{omitted} bytes omitted] ...\n\n".encode() + tail
+
+
+def read_text(path, limit=None):
+    """
+    A file's text for the dump, or None when it is too large or looks binary. Size and
+    the first block are checked before the rest of the file is read. With limit, a
+    larger file is read only as a head/tail excerpt of about limit bytes.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > MAX_DUMP_BYTES:
+            return None
+        if limit is not None and size > limit:
+            head = f.read(max(limit // 2, 1))
+            if b"\0" in head[:SNIFF_BYTES]:
+                return None
+            f.seek(size - limit // 2)
+            tail = f.read()
+            data = _excerpt(head, tail, size - len(head) - len(tail))
+        else:
+            head = f.read(SNIFF_BYTES)
+            if b"\0" in head:
+                return None
+            data = head + f.read()
+    text = data.decode("utf-8", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
 
-            if not include_this:
-                continue
 
-            # skip hidden files unless overridden
-            if fname.startswith('.') and fname not in overrides:
-                continue
+def code_block(entry, limit=None):
+    """
+    [path line, fenced block] for one file, or None when it is not dumped after all.
+    """
+    try:
+        content = read_text(entry.path, limit)
+    except Exception:
+        return None
+    if content is None:
+        return None
+    content = content.strip()
+    if entry.name == '__init__.py' and not content:
+        return None
 
-            # skip under .git/dist unless overridden
-            rel_dir = Path(dirpath).relative_to(root)
-            if any(part in SKIP_TREE_FILES for part in rel_dir.parts) and not any(part in overrides for part in rel_dir.parts):
-                continue
+    lang = LANG_MAP.get(Path(entry.name).suffix.lower(), "")
+    if entry.name == "Dockerfile":
+        lang = "docker"
 
-            rel_path = Path(dirpath, fname).relative_to(root)
+    if lang:
+        return [f"path: {Path(entry.rel)}", f"```{lang}\n{content}\n```"]
+    return [f"path: {Path(entry.rel)}", f"```\n{content}\n```"]
+
+
+def _ordered_map(fn, items, workers):
+    """
+    map() over a thread pool, yielding results in input order with a bounded read-ahead.
+    """
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= workers * READ_AHEAD_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_file_blocks(files, limits=None, cache=None, workers=1):
+    """
+    (rel, fingerprint, block) for each file marked for the dump, always in the order
+    of files; the block is its "path:" line and fenced content. With limits (from
+    plan_budget) only the files it names are dumped, each up to its byte limit. Files
+    are read on `workers` threads. With an ExportCache, files unchanged since the last
+    export to the same output are not opened; their block is read back from that
+    output. The fingerprint is None when there is no cache.
+    """
+    if limits is not None:
+        files = [e for e in files if e.rel in limits]
+
+    def load(entry):
+        limit = limits[entry.rel] if limits is not None else None
+        key = None
+        if cache is not None:
             try:
-                with open(os.path.join(dirpath, fname), encoding="utf-8", errors="replace") as f:
-                    content = f.read().strip()
-            except Exception:
-                continue
-            if fname == '__init__.py' and not content:
-                continue
-
-            # language mapping
-            lang_map = {
-                ".py": "python", ".json": "json", ".yml": "yaml", ".yaml": "yaml",
-                ".toml": "toml", ".md": "markdown", ".env": "", ".txt": "",
-                "Dockerfile": "docker"
-            }
-            lang = lang_map.get(ext, "")
-            if fname == "Dockerfile":
-                lang = "docker"
-
-            blocks.append(f"path: {rel_path}")
-            if lang:
-                blocks.append(f"```{lang}\n{content}\n```")
-            else:
-                blocks.append(f"```\n{content}\n```")
+                block, key = cache.lookup(entry.rel, entry.path, limit)
+            except OSError:
+                return None
+            if block is not None:
+                return entry.rel, key, block
+        block = code_block(entry, limit)
+        return None if block is None else (entry.rel, key, "\n\n".join(block))
 
-    return "\n\n".join(blocks)
+    for found in _ordered_map(load, files, workers):
+        if found is not None:
+            yield found
 
-def export_project(root_path: str, output_path: str = None, include_env: bool = False, include_list=None):
-    root = Path(root_path).resolve()
-    include_list = include_list or set()
+
+def iter_code_blocks(files, limits=None, workers=1):
+    """
+    The block ("path:" line and fenced content) of each file marked for the dump, in
+    the order of files; see iter_file_blocks.
+    """
+    for _, _, block in iter_file_blocks(files, limits, workers=workers):
+        yield block
+
+
+def dump_code_files(root, include_env=False, overrides=None, files=None, use_ignore=True):
+    """
+    Fenced content blocks for every file marked for the dump. `files` lets a caller
+    reuse the TreeEntry records of a walk it already did.
+    """
+    if files is None:
+        files = [e for e in walk_project(root, overrides=overrides, include_env=include_env,
+                                         use_ignore=use_ignore) if e.dump]
+    return "\n\n".join(iter_code_blocks(files))
+
+
+def iter_export_sections(root, include_env=False, overrides=None, use_ignore=True,
+                max_tokens=None, max_bytes_per_file=None, cache=None, workers=1):
+    """
+    The whole export as a stream of (rel, fingerprint, text): the fenced tree, written
+    line by line while the project is walked, then each file block as it is read. rel
+    and fingerprint are None except on file blocks (see iter_file_blocks). Joined, the
+    texts are exactly the export text.
+
+    With max_tokens, whatever the tree leaves of the budget goes to the best-ranked
+    files (see plan_budget), and a closing note says how many were left out. A tree
+    too big for the budget on its own is cut off, with a note in its place.
+    max_bytes_per_file caps every file to a head/tail excerpt of that size.
+    cache and workers are passed on to iter_file_blocks.
+    """
+    files = []
+    tree_tokens = 0
+    tree_cut = 0
+    tree_budget = max_tokens - NOTE_TOKENS if max_tokens is not None else None
+
+    def tracked():
+        for e in walk_project(root, overrides=overrides, include_env=include_env, use_ignore=use_ignore):
+            if e.dump:
+                files.append(e)
+            yield e
 
     # wrap the tree in backticks
-    tree_md = "```\n" + build_tree(root, overrides=include_list) + "\n```"
+    yield None, None, "```\n"
+    for i, line in enumerate(iter_tree_lines(root, tracked())):
+        cost = estimate_tokens(line) + 1
+        # the walk still has to finish for the file list, only its lines are dropped
+        if tree_budget is not None and (tree_cut or tree_tokens + cost > tree_budget):
+            tree_cut += 1
+            continue
+        tree_tokens += cost
+        yield None, None, f"\n{line}" if i else line
+    if tree_cut:
+        yield None, None, f"\n... ({tree_cut} more entries left out to fit the {max_tokens} token budget)"
+    yield None, None, "\n```\n\n"
 
-    code_md = dump_code_files(root, include_env=include_env, overrides=include_list)
+    limits = None
+    omitted = 0
+    if max_tokens is not None:
+        limits, omitted = plan_budget(files, max(tree_budget - tree_tokens, 0), max_bytes_per_file)
+    elif max_bytes_per_file:
+        limits = {e.rel: max_bytes_per_file for e in files}
 
-    full = "\n\n".join([tree_md, code_md])
+    blocks = iter_file_blocks(files, limits, cache=cache, workers=workers)
+    for i, (rel, key, block) in enumerate(blocks):
+        if i:
+            yield None, None, "\n\n"
+        yield rel, key, block
+    if omitted:
+        yield None, None, f"\n\n({omitted} files left out to fit the {max_tokens} token budget)"
 
-    if output_path:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(full)
-        print(f"Exported to {output_path}")
+
+def iter_export(root, include_env=False, overrides=None, use_ignore=True,
+                max_tokens=None, max_bytes_per_file=None, workers=1):
+    """
+    The export text as a stream of pieces; see iter_export_sections.
+    """
+    for _, _, text in iter_export_sections(root, include_env=include_env, overrides=overrides,
+                                           use_ignore=use_ignore, max_tokens=max_tokens,
+                                           max_bytes_per_file=max_bytes_per_file, workers=workers):
+        yield text
+
+
+def export_project(root_path: str, output_path: str = None, include_env: bool = False, include_list=None,
+                   use_ignore: bool = True, max_tokens: int = None, max_bytes_per_file: int = None,
+                   use_cache: bool = True, workers: int = 8, incremental: bool = False,
+                   output_format: str = "markdown"):
+    """
+    Write the export to output_path, or print it. An output file is replaced once the
+    new export is complete; unless use_cache is off, blocks of files unchanged since
+    the last export to it are copied from the old file instead of being re-read. With
+    incremental, the file is patched in place instead, rewriting only the sections that
+    changed (needs output_path and the cache). output_format "ndjson" exports only the
+    tree, as one JSON record per entry (see iter_tree_records).
+    """
+    root = Path(root_path).resolve()
+    include_list = include_list or set()
+
+    if output_format == "ndjson":
+        pieces = iter_ndjson_tree(root, overrides=include_list, use_ignore=use_ignore)
+        if output_path:
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.writelines(pieces)
+            print(f"Exported to {output_path}")
+        else:
+            sys.stdout.writelines(pieces)
+        return
+
+    if not output_path:
+        sys.stdout.writelines(iter_export(root, include_env=include_env, overrides=include_list,
+                                          use_ignore=use_ignore, max_tokens=max_tokens,
+                                          max_bytes_per_file=max_bytes_per_file, workers=workers))
+        sys.stdout.write("\n")
+        return
+
+    cache = ExportCache(output_path) if use_cache else None
+    writer = PatchWriter(output_path, cache.sections if cache else None, in_place=incremental)
+    for rel, key, text in iter_export_sections(root, include_env=include_env, overrides=include_list,
+                                               use_ignore=use_ignore, max_tokens=max_tokens,
+                                               max_bytes_per_file=max_bytes_per_file,
+                                               cache=cache, workers=workers):
+        if rel is None:
+            writer.write(text)
+        else:
+            writer.write_section(rel, key, text)
+    if cache is not None:
+        cache.close()
+    sections = writer.close()
+    if cache is not None:
+        cache.save(sections)
+    if incremental:
+        print(f"Exported to {output_path} ({writer.rewritten} of {len(sections)} sections rewritten)")
     else:
-        print(full)
+        print(f"Exported to {output_path}")
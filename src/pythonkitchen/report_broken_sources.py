@@ -3,7 +3,9 @@
 import os
 import sys
 import html
+import argparse
 import pandas as pd
+import requests
 import browser_cookie3
 
 from selenium import webdriver
@@ -12,11 +14,15 @@ from selenium.webdriver.chrome.service  import Service
 from webdriver_manager.chrome          import ChromeDriverManager
 from selenium.common.exceptions       import InvalidSessionIdException
 from bs4                                import BeautifulSoup
+from requests.adapters                  import HTTPAdapter
+from concurrent.futures                 import ThreadPoolExecutor
 
 # — CONFIG — 
 EXCEL_PATH = os.path.expanduser('~/Desktop/course_template.xlsx')
 SHEET_NAME = 'lessons'
 OUTPUT_CSV = os.path.expanduser('~/Desktop/broken_sources_report.csv')
+PAGE_WORKERS = 8   # lesson pages fetched in parallel by the HTTP resolver
+TIMEOUT      = (10, 30)  # connect, read seconds for a lesson page
 
 # — HELPERS — 
 def make_chrome_driver():
@@ -27,6 +33,15 @@ def make_chrome_driver():
     svc  = Service(ChromeDriverManager().install())
     return webdriver.Chrome(service=svc, options=opts)
 
+def make_page_session(pool_size: int = PAGE_WORKERS):
+    # piggy-back your Chrome cookies for auth
+    sess = requests.Session()
+    sess.cookies.update(browser_cookie3.chrome())
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    return sess
+
 def find_source_url(html_text: str) -> str | None:
     soup = BeautifulSoup(html_text, "html.parser")
     sel  = soup.select_one("select.video-download-selector")
@@ -38,23 +53,50 @@ def find_source_url(html_text: str) -> str | None:
             return html.unescape(opt["value"])
     return None
 
+def fetch_source_url(sess: requests.Session, lesson_url: str) -> str | None:
+    # None also when the page fails to load; Chrome gets a second look at those
+    try:
+        r = sess.get(lesson_url, timeout=TIMEOUT)
+        r.raise_for_status()
+    except requests.RequestException:
+        return None
+    return find_source_url(r.text)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Report lessons whose page has no SOURCE download option.")
+    parser.add_argument("--resolver", choices=("http", "selenium"), default="http",
+                        help="http: fetch pages with the Chrome cookies and re-check only the misses in Chrome; "
+                             "selenium: load every page in Chrome")
+    parser.add_argument("--page-workers", type=int, default=PAGE_WORKERS, help="pages fetched in parallel")
+    return parser.parse_args(argv)
+
 def main():
+    args = parse_args()
     # 1) Load the sheet
     df = pd.read_excel(EXCEL_PATH, sheet_name=SHEET_NAME, engine="openpyxl")
     if not {"chapter_index","name","link"}.issubset(df.columns):
         print("🚨 Missing one of required columns (chapter_index,name,link).", file=sys.stderr)
         sys.exit(1)
 
-    driver = make_chrome_driver()
-    broken = []
+    # 2) Fetch every lesson page over HTTP in parallel; Chrome only sees the misses
+    if args.resolver == "http":
+        sess = make_page_session(args.page_workers)
+        with ThreadPoolExecutor(max_workers=args.page_workers) as pool:
+            found = list(pool.map(lambda url: fetch_source_url(sess, url) is not None, df["link"]))
+    else:
+        found = [False] * len(df)
 
-    # 2) Iterate every lesson
-    for i, row in df.iterrows():
+    driver = None
+    broken = []
+    for (i, row), has_source in zip(df.iterrows(), found):
+        if has_source:
+            continue
         lesson_url = row["link"]
         chapter    = row["chapter_index"]
         title      = row["name"]
 
         # load page, restarting Chrome if needed
+        driver = driver or make_chrome_driver()
         try:
             driver.get(lesson_url)
         except InvalidSessionIdException:
@@ -77,7 +119,8 @@ def main():
             })
             print(f"❌ Row {i+2}: No SOURCE → {lesson_url}")
 
-    driver.quit()
+    if driver:
+        driver.quit()
 
     # 3) Write out CSV
     if broken:
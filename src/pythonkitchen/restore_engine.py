@@ -0,0 +1,220 @@
+# src/pythonkitchen/restore_engine.py
+
+import os
+import queue
+import tarfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import click
+
+# files up to this size travel from the reader to a writer as one buffer,
+# larger ones are streamed through a bounded queue of COPY_BUFSIZE pieces
+SMALL_FILE = 1024 * 1024
+COPY_BUFSIZE = 1024 * 1024
+# files at least this large get their full size allocated before writing
+PREALLOC_MIN = 8 * 1024 * 1024
+
+
+def _drain(chunks: queue.Queue):
+    while (data := chunks.get()) is not None:
+        yield data
+
+
+def _preallocate(fd: int, size: int) -> None:
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:  # filesystem without fallocate support
+            pass
+    os.ftruncate(fd, size)
+
+
+class RestoreEngine:
+    """
+    Writes restored entries under a target directory with a pool of writer threads.
+
+    extract_tar() runs the restore in three stages: a reader thread decompresses the
+    tar stream and hands members over, the calling thread creates directories and
+    dispatches files, and the writer pool writes them (preallocating large ones).
+    Symlinks and hard links are created, and directory modes and times applied,
+    in close() once every file is on disk. With dry_run nothing is written, but
+    archives are still read so the stats (and timings) are real.
+    """
+    def __init__(self, target: Path, workers: int = 4, dry_run: bool = False):
+        self.target = Path(target)
+        self.dry_run = dry_run
+        self.stats = {'files': 0, 'dirs': 0, 'links': 0, 'bytes': 0}
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(workers * 4)
+        self._futures = []
+        self._made = set()
+        self._made_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._dir_attrs = {}
+        self._links = []
+
+    def _dest(self, name: str) -> Path | None:
+        parts = Path(name).parts
+        if Path(name).is_absolute() or '..' in parts or not parts:
+            click.echo(f"Refusing to restore unsafe path: {name}")
+            return None
+        return self.target.joinpath(*parts)
+
+    def _makedirs(self, path: Path) -> None:
+        if self.dry_run or path in self._made:
+            return
+        with self._made_lock:
+            if path not in self._made:
+                path.mkdir(parents=True, exist_ok=True)
+                self._made.add(path)
+
+    def make_dirs(self, names) -> None:
+        """
+        Directory-creation pass: create every parent directory the given entries need.
+        """
+        dirs = set()
+        for name in names:
+            dest = self._dest(name)
+            if dest is not None:
+                dirs.add(dest.parent)
+        for path in sorted(dirs):
+            self._makedirs(path)
+
+    def make_dir(self, name: str, mode: int | None = None, mtime_ns: int | None = None) -> None:
+        dest = self._dest(name)
+        if dest is None:
+            return
+        self._makedirs(dest)
+        self.stats['dirs'] += 1
+        if mode is not None:
+            self._dir_attrs[dest] = (mode, mtime_ns)
+
+    def make_link(self, name: str, link_target: str, hard: bool = False) -> None:
+        dest = self._dest(name)
+        if dest is not None:
+            self._links.append((dest, link_target, hard))
+            self.stats['links'] += 1
+
+    def write_file(self, name: str, size: int, mode: int, mtime_ns: int, chunks) -> None:
+        """
+        Queue a file write. chunks is any iterable of bytes; it is consumed on a writer thread.
+        """
+        dest = self._dest(name)
+        if dest is None:
+            for _ in chunks:
+                pass
+            return
+        self._slots.acquire()
+        future = self._pool.submit(self._write, dest, size, mode, mtime_ns, chunks)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _write(self, dest: Path, size: int, mode: int, mtime_ns: int, chunks) -> None:
+        written = 0
+        try:
+            if self.dry_run:
+                for data in chunks:
+                    written += len(data)
+            else:
+                self._makedirs(dest.parent)
+                if dest.is_symlink():
+                    dest.unlink()
+                with open(dest, 'wb') as f:
+                    if size >= PREALLOC_MIN:
+                        _preallocate(f.fileno(), size)
+                    for data in chunks:
+                        f.write(data)
+                        written += len(data)
+                os.chmod(dest, mode)
+                os.utime(dest, ns=(mtime_ns, mtime_ns))
+        except BaseException:
+            # keep the producer from blocking on a queue nobody reads anymore
+            for _ in chunks:
+                pass
+            raise
+        if written != size:
+            raise OSError(f"Restored {written} of {size} bytes for {dest}")
+        with self._stats_lock:
+            self.stats['files'] += 1
+            self.stats['bytes'] += written
+
+    def extract_tar(self, raw, select) -> int:
+        """
+        Restore the members select(tar) yields from a streaming tar over the file object raw.
+        Returns the number of members selected.
+        """
+        items = queue.Queue(maxsize=64)
+
+        def read():
+            current = None
+            try:
+                with tarfile.open(fileobj=raw, mode="r|") as tar:
+                    for member in select(tar):
+                        if not member.isreg():
+                            items.put((member, None))
+                            continue
+                        fileobj = tar.extractfile(member)
+                        if member.size <= SMALL_FILE:
+                            items.put((member, [fileobj.read()]))
+                            continue
+                        current = queue.Queue(maxsize=8)
+                        items.put((member, _drain(current)))
+                        while data := fileobj.read(COPY_BUFSIZE):
+                            current.put(data)
+                        current.put(None)
+                        current = None
+                items.put(None)
+            except BaseException as e:
+                if current is not None:
+                    current.put(None)
+                items.put(e)
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        count = 0
+        while (item := items.get()) is not None:
+            if isinstance(item, BaseException):
+                reader.join()
+                raise item
+            member, chunks = item
+            count += 1
+            mtime_ns = int(member.mtime * 1_000_000_000)
+            if member.isdir():
+                self.make_dir(member.name, member.mode, mtime_ns)
+            elif member.isreg():
+                self.write_file(member.name, member.size, member.mode, mtime_ns, chunks)
+            elif member.issym():
+                self.make_link(member.name, member.linkname)
+            elif member.islnk():
+                self.make_link(member.name, member.linkname, hard=True)
+        reader.join()
+        return count
+
+    def close(self) -> dict:
+        """
+        Wait for all writes, then create links and apply directory attributes, deepest first.
+        """
+        self._pool.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
+        if not self.dry_run:
+            for dest, link_target, hard in self._links:
+                self._makedirs(dest.parent)
+                if dest.is_symlink() or dest.exists():
+                    dest.unlink()
+                if hard:
+                    linked = self._dest(link_target)
+                    if linked is None or not linked.exists():
+                        click.echo(f"Skipping hard link {dest}: its target {link_target} was not restored.")
+                        continue
+                    os.link(linked, dest)
+                else:
+                    os.symlink(link_target, dest)
+            for dest in sorted(self._dir_attrs, reverse=True):
+                mode, mtime_ns = self._dir_attrs[dest]
+                os.chmod(dest, mode)
+                if mtime_ns is not None:
+                    os.utime(dest, ns=(mtime_ns, mtime_ns))
+        return self.stats